@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+
+# Charts keep at most this many points per series, and switch to WebGL
+# (Scattergl) and drop the markers above WEBGL_THRESHOLD points in total
+MAX_CHART_POINTS = 500
+WEBGL_THRESHOLD = 1000
+
+
+# Function to get clubs by sanctions count
+def get_clubs_data(df, limit=None, type="default"):
+    if df.empty:
+        return df
+    
+    aggregation = {
+        'quantity': 'sum',
+        'fines': 'sum',
+        'suspension_days': 'sum'
+    }
+
+    columns = {
+        'quantity': 'Total Castigos',
+        'fines': 'Total Multas',
+        'suspension_days': 'Total Dias de Suspensão'
+    }
+   
+    if type != "default":
+        del aggregation['suspension_days']
+        del columns['suspension_days']
+
+    data = (df.groupby('club_group').agg(aggregation).sort_values('quantity', ascending=False, kind='stable').reset_index().rename(
+        columns=columns
+    ))
+    if limit:
+        return data.head(limit)
+    return data
+
+
+def get_summary(df, type="default"):
+    """Totals shown in the summary statistics of a sanctions table"""
+    summary = {
+        "total_sanctions": int(df['quantity'].sum()) if 'quantity' in df else 0,
+        "total_fines": float(df['fines'].sum()) if 'fines' in df else 0.0,
+    }
+    if type == "default":
+        summary["total_suspension_days"] = int(df['suspension_days'].sum()) if 'suspension_days' in df else 0
+    if type == "adepts":
+        summary["total_clubs"] = len(df['club_group'].unique()) if 'club_group' in df else 0
+    return summary
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # The first and last points are kept, the others are split in threshold - 2 buckets
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(int)
+    indices = np.empty(threshold, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+        # Point of the bucket making the largest triangle with the previous
+        # kept point and the average of the next bucket
+        areas = np.abs((x[previous] - average_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y - y[previous]))
+        previous = start + int(areas.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+
+def step_indices(n, threshold):
+    """Indices of the first and last point of threshold / 2 buckets.
+
+    For a cumulative (non-decreasing) series every dropped point lies between
+    the kept points around it, so the line never overshoots the real values.
+    """
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    edges = np.floor(np.linspace(0, n, threshold // 2 + 1)).astype(int)
+    return np.unique(np.concatenate([edges[:-1], edges[1:] - 1]))
+
+
+def downsample(df, x, y, max_points=MAX_CHART_POINTS, method="step"):
+    """Rows of a series (sorted by x) kept for a chart, with their exact values"""
+    if len(df) <= max_points:
+        return df
+    if method == "lttb":
+        x_values = df[x].to_numpy()
+        if np.issubdtype(x_values.dtype, np.datetime64):
+            x_values = x_values.astype('int64')
+        indices = lttb_indices(x_values.astype(float), df[y].to_numpy(dtype=float), max_points)
+    else:
+        indices = step_indices(len(df), max_points)
+    return df.iloc[indices]
+
+
+def downsample_groups(df, group, x, y, max_points=MAX_CHART_POINTS, method="step"):
+    """Downsample every series of a long frame, one series per value of `group`"""
+    if df.empty or df.groupby(group).size().max() <= max_points:
+        return df
+    return pd.concat([downsample(series, x, y, max_points, method) for _, series in df.groupby(group, sort=False)])
+
+
+def render_mode(points):
+    return "webgl" if points > WEBGL_THRESHOLD else "svg"
+
+
+def line_mode(points):
+    # Markers are the most expensive part of a large chart to draw
+    return "lines+markers" if points <= WEBGL_THRESHOLD else "lines"
+
+
+def create_cumulative_sanctions_chart(df, top_10_clubs):
+    # Plotly is only imported once a chart is drawn
+    import plotly.express as px
+
+    # Filter for top 10 clubs
+    filtered_df = df[df['club_group'].isin(top_10_clubs['club_group'])]
+
+    # Create daily sanctions per club
+    daily_sanctions = (filtered_df.groupby(
+        ['date', 'club_group', 'quantity']).size().reset_index(name='count'))
+
+    # Calculate cumulative sanctions for each club
+    daily_sanctions = daily_sanctions.sort_values('date')
+    cumulative_sanctions = []
+
+    for club in top_10_clubs['club_group']:
+        club_data = daily_sanctions[daily_sanctions['club_group'] == club].copy()
+
+        club_data['cumulative_count'] = club_data['quantity'].cumsum()
+        cumulative_sanctions.append(club_data)
+
+    cumulative_df = downsample_groups(pd.concat(cumulative_sanctions), 'club_group', 'date', 'cumulative_count')
+
+    # Calculate total cumulative sanctions
+    total_daily = (daily_sanctions.groupby('date')['quantity'].sum().reset_index())
+    total_daily['cumulative_count'] = total_daily['quantity'].cumsum()
+
+    fig = px.line(cumulative_df,
+        x='date',
+        y='cumulative_count',
+        color='club_group',
+        render_mode=render_mode(len(cumulative_df)),
+        title='Castigos Acumulados por Clube',
+        labels={
+            'cumulative_count': 'Castigos',
+            'date': 'Data',
+            'club_group': 'Clube'
+        }
+    )
+    
+    # Add markers to show points explicitly
+    fig.update_traces(mode=line_mode(len(cumulative_df)))
+    
+    # Update x-axis format to show only date
+    fig.update_layout(
+        xaxis_title="Data",
+        yaxis_title="Número de Castigos Acumulados",
+        height=400,
+        xaxis=dict(
+            tickformat="%d %B %Y",
+            tickformatstops=[
+                dict(dtickrange=[None, None], value="%d %B %Y")
+            ]
+        ),
+        legend=dict(
+            orientation="h",    # horizontal orientation
+            yanchor="top",
+            y=-0.2,            # position below the graph
+            xanchor="center",
+            x=0.5
+        )
+    )
+
+    #fig.add_trace(
+    #    go.Scatter(x=total_daily['date'],
+    #               y=total_daily['cumulative_count'],
+    #               name='Total Todos Clubes',
+    #               line=dict(color='black', width=3, dash='dash'),
+    #               mode='lines'))
+
+    fig.update_layout(showlegend=True,
+                      #legend=dict(yanchor="top",
+                     #             y=0.99,
+                     #             xanchor="left",
+                     #             x=1.05),
+                      height=600,
+                      yaxis_title="Número de Castigos Acumulados por Clube")
+
+    return fig
@@ -0,0 +1,88 @@
+import json
+import statistics
+import sys
+import time
+from database.decoding import BACKENDS, decode_query
+from load_test import fake_databases
+
+# Notion databases of the fake backend behind each decoding schema
+DATABASES = {
+    "managers_sanctions": "managers",
+    "adepts_sanctions": "adepts",
+    "clubs_contacts": "clubs",
+    "clubs_alias": "alias",
+}
+
+def full_property(name, value):
+    """A property with the metadata Notion sends along with its value"""
+    value = dict(value)
+    kind = next(iter(value))
+    if kind in ("title", "rich_text"):
+        value[kind] = [{
+            "type": "text",
+            "text": {**item["text"], "link": None},
+            "annotations": {"bold": False, "italic": False, "strikethrough": False, "underline": False, "code": False, "color": "default"},
+            "plain_text": item["text"]["content"],
+            "href": None,
+        } for item in value[kind]]
+    elif kind == "select" and value["select"]:
+        value["select"] = {"id": "a1b2", "name": value["select"]["name"], "color": "blue"}
+    elif kind == "date" and value["date"]:
+        value["date"] = {**value["date"], "end": None, "time_zone": None}
+    elif kind == "relation":
+        value["has_more"] = False
+    return {"id": name[:4], "type": kind, **value}
+
+def full_row(row):
+    """A fake row with the page fields of a real Notion query response"""
+    user = {"object": "user", "id": "5b0c8c2a-3d1e-4c5f-9a7b-1e2d3c4b5a69"}
+    return {
+        "object": "page",
+        "id": row["id"],
+        "created_time": "2024-12-01T10:00:00.000Z",
+        "last_edited_time": row["last_edited_time"],
+        "created_by": user,
+        "last_edited_by": user,
+        "cover": None,
+        "icon": None,
+        "parent": {"type": "database_id", "database_id": "186a786c-52e4-8053-8031-da7fd487febc"},
+        "archived": False,
+        "in_trash": False,
+        "properties": {name: full_property(name, value) for name, value in row["properties"].items()},
+        "url": "https://www.notion.so/" + row["id"].replace("-", ""),
+        "public_url": None,
+    }
+
+def query_pages(rows, page_size=100):
+    """Response bodies of a database query, as Notion paginates them"""
+    pages = []
+    for start in range(0, len(rows), page_size):
+        next_cursor = str(start + page_size) if start + page_size < len(rows) else None
+        result = {"object": "list", "results": rows[start:start + page_size], "next_cursor": next_cursor, "has_more": next_cursor is not None}
+        pages.append(json.dumps(result).encode("utf8"))
+    return pages
+
+def time_decoding(pages, schema, backend, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for content in pages:
+            decode_query(content, schema, backend)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    databases, _ = fake_databases(scale)
+    print("backends: " + ", ".join(BACKENDS))
+    print(f"\n{'per row (µs)':<20}{'rows':>7}" + "".join(f"{backend:>10}" for backend in BACKENDS))
+    for schema, database in DATABASES.items():
+        rows = [full_row(row) for row in databases[database]]
+        pages = query_pages(rows)
+        records = [decode_query(content, schema, "json")[0] for content in pages]
+        # Every backend must build the same records
+        for backend in BACKENDS:
+            assert [decode_query(content, schema, backend)[0] for content in pages] == records, backend
+        timings = [time_decoding(pages, schema, backend, runs) / len(rows) * 1e6 for backend in BACKENDS]
+        print(f"{schema:<20}{len(rows):>7}" + "".join(f"{timing:>10.2f}" for timing in timings))
@@ -0,0 +1,44 @@
+import statistics
+import subprocess
+import sys
+import time
+
+# Import paths timed in a fresh interpreter, as a cold start would run them
+TARGETS = {
+    "app (main.py)": "import main",
+    "dataset loaders": "import database.datasets",
+    "notion client": "import database.notion",
+    "maintenance scripts": "import database.notion, config, jobs",
+    "charts (plotly.express)": "import plotly.express",
+}
+
+def time_import(code, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def slowest_imports(code, limit=10):
+    """Modules with the largest cumulative import time, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    baseline = time_import("pass", runs)
+    print(f"interpreter startup: {baseline * 1000:.0f} ms")
+    for label, code in TARGETS.items():
+        elapsed = time_import(code, runs)
+        print(f"{label}: {(elapsed - baseline) * 1000:.0f} ms")
+
+    print("\nslowest imports of main.py (cumulative):")
+    for cumulative, name in slowest_imports(TARGETS["app (main.py)"]):
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
@@ -0,0 +1,273 @@
+import bisect
+import datetime
+import threading
+import pandas as pd
+
+MEASURES = ['quantity', 'fines', 'suspension_days']
+
+COLUMNS = {
+    'quantity': 'Total Castigos',
+    'fines': 'Total Multas',
+    'suspension_days': 'Total Dias de Suspensão'
+}
+
+
+def to_day(value):
+    """Day number (proleptic ordinal) of a date, timestamp or ISO string"""
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10]).toordinal()
+    return value.toordinal()
+
+
+def to_number(value):
+    # Missing measures count as 0, like the fillna(0) of the full computation
+    if value is None or value != value:
+        return 0
+    return value.item() if hasattr(value, 'item') else value
+
+
+class FenwickTree:
+    """Prefix sums over positions 0..size-1, updated and queried in O(log size)"""
+
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, position, value):
+        position += 1
+        while position < len(self.tree):
+            self.tree[position] += value
+            position += position & -position
+
+    def prefix(self, position):
+        """Sum of positions 0..position"""
+        position = min(position + 1, len(self.tree) - 1)
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+
+class DailySeries:
+    """Daily sums of the measures and their running totals, for one club or for all of them.
+
+    Days are kept sorted and indexed by a Fenwick tree per measure, so adding
+    or removing a row and reading the cumulative value at any date are
+    O(log days). The trees cover a window of days that doubles when a date
+    falls outside of it.
+    """
+
+    def __init__(self, measures):
+        self.measures = measures
+        self.daily = {}
+        self.days = []
+        self.origin = None
+        self.size = 0
+        self.trees = []
+
+    def resize(self, day):
+        days = self.days + [day]
+        low, high = min(days), max(days)
+        size = 64
+        while size < 2 * (high - low + 1) + 32:
+            size *= 2
+        # Some room before the first day for late backfills
+        self.origin = low - 32
+        self.size = size
+        self.trees = [FenwickTree(size) for _ in self.measures]
+        for other, values in self.daily.items():
+            for tree, value in zip(self.trees, values):
+                tree.add(other - self.origin, value)
+
+    def add(self, day, values, sign=1):
+        if self.origin is None or not 0 <= day - self.origin < self.size:
+            self.resize(day)
+        if day not in self.daily:
+            self.daily[day] = [0] * (len(self.measures) + 1)
+            bisect.insort(self.days, day)
+        sums = self.daily[day]
+        for index, (tree, value) in enumerate(zip(self.trees, values)):
+            tree.add(day - self.origin, sign * value)
+            sums[index] += sign * value
+        sums[-1] += sign
+        # A day without rows disappears from the series, as in a groupby
+        if sums[-1] == 0:
+            del self.daily[day]
+            del self.days[bisect.bisect_left(self.days, day)]
+
+    def cumulative_at(self, day, measure):
+        if self.origin is None or day < self.origin:
+            return 0
+        return self.trees[self.measures.index(measure)].prefix(min(day - self.origin, self.size - 1))
+
+    def frame(self, measure):
+        index = self.measures.index(measure)
+        values = [self.daily[day][index] for day in self.days]
+        df = pd.DataFrame({
+            'date': pd.to_datetime([datetime.date.fromordinal(day) for day in self.days]),
+            measure: values,
+        })
+        df['cumulative_' + measure] = df[measure].cumsum()
+        return df
+
+
+class ClubAggregates:
+    """Per-club totals, ranking, cumulative series and global totals of a sanctions dataset,
+    maintained from the inserted, updated and deleted rows instead of the full history.
+
+    Rows are identified by their page_id. Applying a delta with apply costs
+    O(delta * log n): totals are dict updates, the ranking is a sorted list
+    updated with bisect and the series are DailySeries. sync finds that delta
+    in a full frame, which stays O(n), see its docstring.
+    """
+
+    def __init__(self, measures=MEASURES):
+        self.measures = list(measures)
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.rows = {}
+        self.edited = {}
+        # Newest last_edited_time of the last sync
+        self.newest_edit = ""
+        self.totals = {}
+        self.total = [0] * (len(self.measures) + 1)
+        self.ranking = []
+        self.series = {}
+        self.all_series = DailySeries(self.measures)
+
+    def ranking_key(self, club):
+        # Same order as get_clubs_data: most sanctions first, then by name
+        return (-self.totals[club][0], club)
+
+    def parse(self, row):
+        club = str(row['club_group']).strip()
+        values = tuple(to_number(row.get(measure)) for measure in self.measures)
+        return club, to_day(row['date']), values
+
+    def add(self, club, day, values, sign):
+        if club in self.totals:
+            del self.ranking[bisect.bisect_left(self.ranking, self.ranking_key(club))]
+        else:
+            self.totals[club] = [0] * (len(self.measures) + 1)
+            self.series[club] = DailySeries(self.measures)
+
+        totals = self.totals[club]
+        for index, value in enumerate(values):
+            totals[index] += sign * value
+            self.total[index] += sign * value
+        totals[-1] += sign
+        self.total[-1] += sign
+        self.series[club].add(day, values, sign)
+        self.all_series.add(day, values, sign)
+
+        if totals[-1] == 0:
+            del self.totals[club]
+            del self.series[club]
+        else:
+            bisect.insort(self.ranking, self.ranking_key(club))
+
+    def insert(self, row):
+        if row['page_id'] in self.rows:
+            self.delete(row['page_id'])
+        parsed = self.parse(row)
+        self.rows[row['page_id']] = parsed
+        self.edited[row['page_id']] = row.get('last_edited_time')
+        self.add(*parsed, 1)
+
+    def delete(self, page_id):
+        self.edited.pop(page_id, None)
+        parsed = self.rows.pop(page_id, None)
+        if parsed is not None:
+            self.add(*parsed, -1)
+
+    def apply(self, inserted=(), updated=(), deleted=()):
+        """Apply a delta: new rows, changed rows and the page_id of removed rows"""
+        with self.lock:
+            for page_id in deleted:
+                self.delete(page_id)
+            for row in list(updated) + list(inserted):
+                self.insert(row)
+
+    def sync(self, df):
+        """Bring the aggregates to the rows of a dataset, applying only what changed.
+
+        Rows are compared on their last_edited_time, so only new and edited
+        rows are parsed. Notion rounds it to the minute: rows in the newest
+        minute of the last sync may have been edited again since, so they are
+        applied again too. Frames without last_edited_time are compared row
+        by row, and frames without page_id are aggregated from scratch.
+
+        Finding the delta is still O(n): the edit times of the whole frame are
+        compared, in vectorized pandas operations, like the full fetch that
+        produced the frame. Only the delta is parsed and applied, in
+        O(delta * log n). Callers with the delta itself should use apply.
+        Returns the number of rows applied or deleted.
+        """
+        with self.lock:
+            if df.empty or 'page_id' not in df:
+                self.reset()
+                if not df.empty:
+                    for page_id, row in enumerate(df.to_dict(orient='records')):
+                        self.insert({**row, 'page_id': page_id})
+                return len(self.rows)
+
+            columns = ['page_id', 'club_group', 'date'] + [measure for measure in self.measures if measure in df]
+            if 'last_edited_time' in df:
+                edited = df['last_edited_time']
+                is_edited = (df['page_id'].map(self.edited) != edited) | edited.isna()
+                is_recent = ~is_edited & (edited >= self.newest_edit)
+                changed = df.loc[is_edited, columns + ['last_edited_time']].to_dict(orient='records')
+                recent = df.loc[is_recent, columns + ['last_edited_time']].to_dict(orient='records')
+                changed += [row for row in recent if self.rows.get(row['page_id']) != self.parse(row)]
+                newest = edited.dropna().max() if edited.notna().any() else ""
+            else:
+                rows = df[columns].to_dict(orient='records')
+                changed = [row for row in rows if self.rows.get(row['page_id']) != self.parse(row)]
+                newest = ""
+            self.apply(inserted=changed)
+            # Every page of the frame is applied now, any extra row was deleted
+            # (page ids are unique), so the ids are only compared when one was
+            deleted = [] if len(self.rows) == len(df) else list(self.rows.keys() - set(df['page_id']))
+            self.apply(deleted=deleted)
+            self.newest_edit = newest
+            return len(deleted) + len(changed)
+
+    def clubs_data(self, limit=None, type="default"):
+        """Same frame as get_clubs_data, read from the maintained ranking"""
+        with self.lock:
+            measures = [measure for measure in self.measures if type == "default" or measure != 'suspension_days']
+            clubs = [club for _, club in (self.ranking[:limit] if limit else self.ranking)]
+            data = {'club_group': clubs}
+            for measure in measures:
+                index = self.measures.index(measure)
+                data[COLUMNS[measure]] = [self.totals[club][index] for club in clubs]
+            return pd.DataFrame(data)
+
+    def summary(self, type="default"):
+        """Same totals as get_summary"""
+        with self.lock:
+            summary = {
+                "total_sanctions": int(self.total[self.measures.index('quantity')]),
+                "total_fines": float(self.total[self.measures.index('fines')]),
+            }
+            if type == "default":
+                summary["total_suspension_days"] = int(self.total[self.measures.index('suspension_days')])
+            if type == "adepts":
+                summary["total_clubs"] = len(self.totals)
+            return summary
+
+    def cumulative_series(self, club=None, measure='quantity'):
+        """Daily values and running total of a measure, for a club or for all clubs"""
+        with self.lock:
+            series = self.all_series if club is None else self.series.get(str(club).strip())
+            if series is None:
+                return pd.DataFrame(columns=['date', measure, 'cumulative_' + measure])
+            return series.frame(measure)
+
+    def cumulative_at(self, club, date, measure='quantity'):
+        """Running total of a measure for a club (or all clubs) up to a date, in O(log n)"""
+        with self.lock:
+            series = self.all_series if club is None else self.series.get(str(club).strip())
+            return series.cumulative_at(to_day(date), measure) if series else 0
@@ -0,0 +1,171 @@
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+IMAGES_DIR = "club_images"
+INDEX_FILE = os.path.join(IMAGES_DIR, "index.json")
+THUMBNAIL_SIZE = (200, 200)
+MAX_IMAGES = 500  # Least recently used thumbnails are evicted past this count
+RETRY_AFTER = 3600  # Seconds before retrying a url that failed to download
+SAVE_INTERVAL = 60  # Seconds between saves of the access times of cache hits
+
+lock = threading.Lock()
+index = None
+failed = {}
+last_saved = 0
+
+def load_index():
+    """Index of the cache: urls to content hashes and validators, thumbnails to last access time"""
+    global index
+    if index is None:
+        if os.path.exists(INDEX_FILE):
+            with open(INDEX_FILE, 'r', encoding='utf8') as file:
+                index = json.load(file)
+        else:
+            index = {"urls": {}, "thumbnails": {}}
+        index.setdefault("validators", {})
+    return index
+
+def save_index():
+    global last_saved
+    last_saved = time.time()
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+    tmp_path = INDEX_FILE + ".tmp"
+    with open(tmp_path, 'w', encoding='utf8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, INDEX_FILE)
+
+def thumbnail_path(content_hash):
+    return os.path.join(IMAGES_DIR, content_hash + ".png")
+
+def make_thumbnail(content):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(content))
+    image.thumbnail(THUMBNAIL_SIZE)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    output = io.BytesIO()
+    image.save(output, format="PNG", optimize=True)
+    return output.getvalue()
+
+def evict():
+    """Remove the thumbnails no url points to anymore, then the least recently used past MAX_IMAGES"""
+    thumbnails = index["thumbnails"]
+    used = set(index["urls"].values())
+    unused = [content_hash for content_hash in thumbnails if content_hash not in used]
+    by_access = sorted((content_hash for content_hash in thumbnails if content_hash in used), key=thumbnails.get)
+    for content_hash in unused + by_access[:max(0, len(by_access) - MAX_IMAGES)]:
+        del thumbnails[content_hash]
+        if os.path.exists(thumbnail_path(content_hash)):
+            os.remove(thumbnail_path(content_hash))
+    index["urls"] = {url: content_hash for url, content_hash in index["urls"].items() if content_hash in thumbnails}
+    index["validators"] = {url: validators for url, validators in index["validators"].items() if url in index["urls"]}
+
+def download_image(url):
+    """Download an image and store its thumbnail, returning the thumbnail path.
+
+    An image already in the cache is downloaded again only if the server says
+    it changed since (ETag / Last-Modified), otherwise its thumbnail is kept.
+    """
+    with lock:
+        load_index()
+        content_hash = index["urls"].get(url)
+        validators = index["validators"].get(url, {}) if content_hash and os.path.exists(thumbnail_path(content_hash)) else {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = requests.get(url, headers=headers, timeout=20)
+    if response.status_code == 304 and headers:
+        with lock:
+            index["thumbnails"][content_hash] = time.time()
+        return thumbnail_path(content_hash)
+    if response.status_code != 200:
+        print("Error: " + url + "..." + str(response.status_code))
+        return None
+
+    # Identical crests served from different urls are stored once
+    content_hash = hashlib.sha256(response.content).hexdigest()[:32]
+    path = thumbnail_path(content_hash)
+    if not os.path.exists(path):
+        try:
+            thumbnail = make_thumbnail(response.content)
+        except Exception as error:
+            print("Error: " + url + "...", error)
+            return None
+        os.makedirs(IMAGES_DIR, exist_ok=True)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(thumbnail)
+        os.replace(path + ".tmp", path)
+
+    with lock:
+        load_index()
+        index["urls"][url] = content_hash
+        index["thumbnails"][content_hash] = time.time()
+        index["validators"][url] = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    return path
+
+def get_thumbnail(url, download=True):
+    """Local thumbnail of an image url, downloaded on first use unless download is False"""
+    if not url:
+        return None
+    with lock:
+        load_index()
+        content_hash = index["urls"].get(url)
+        if content_hash and os.path.exists(thumbnail_path(content_hash)):
+            index["thumbnails"][content_hash] = time.time()
+            # Access times of hits are saved in batches, for the eviction order
+            if time.time() - last_saved > SAVE_INTERVAL:
+                save_index()
+            return thumbnail_path(content_hash)
+    if not download or time.time() - failed.get(url, 0) < RETRY_AFTER:
+        return None
+
+    try:
+        path = download_image(url)
+    except requests.RequestException as error:
+        print("Error: " + url + "...", error)
+        path = None
+    if path is None:
+        failed[url] = time.time()
+        return None
+    with lock:
+        evict()
+        save_index()
+    return path
+
+def download_images(urls, workers=8):
+    """Download the thumbnails of many urls concurrently, checking the cached ones for changes"""
+    load_index()
+    urls = [url for url in dict.fromkeys(urls) if url]
+    print(str(len(urls)) + " images to check")
+
+    def download(url):
+        try:
+            return download_image(url)
+        except requests.RequestException as error:
+            print("Error: " + url + "...", error)
+            return None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        paths = list(executor.map(download, urls))
+
+    with lock:
+        evict()
+        save_index()
+    print(str(sum(1 for path in paths if path)) + " images up to date, " + str(len(index["thumbnails"])) + " thumbnails cached")
+
+if __name__ == "__main__":
+    clubs_file = sys.argv[1] if len(sys.argv) > 1 else "clubs_raw.json"
+    with open(clubs_file, 'r', encoding='utf8') as file:
+        clubs = json.load(file)
+    download_images([club['img_url'] for club in clubs])
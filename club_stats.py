@@ -0,0 +1,98 @@
+import pandas as pd
+
+MEASURES = ['quantity', 'fines', 'suspension_days']
+SOURCES = ['managers', 'adepts']
+ROLLING_WINDOW = 30  # days
+
+
+def combine_sanctions(df_managers, df_adepts, columns=('club_group', 'date')):
+    """Stack both sanctions datasets into one frame with a source column"""
+    columns = list(columns)
+    frames = []
+    for source, df in zip(SOURCES, (df_managers, df_adepts)):
+        if df.empty or 'club_group' not in df:
+            continue
+        frame = df[[column for column in columns if column in df]].reindex(columns=columns)
+        for measure in MEASURES:
+            frame[measure] = df[measure].fillna(0) if measure in df else 0
+        frame['source'] = source
+        frames.append(frame)
+
+    if not frames:
+        # Typed like the real frames, so the aggregations of no rows still work
+        empty = pd.DataFrame(columns=['source'] + columns + MEASURES).astype({measure: float for measure in MEASURES})
+        if 'date' in columns:
+            empty['date'] = pd.to_datetime(empty['date'])
+        return empty
+
+    combined = pd.concat(frames, ignore_index=True)
+    combined['club_group'] = combined['club_group'].astype(str).str.strip()
+    return combined
+
+
+def compute_club_stats(df_managers, df_adepts, window=ROLLING_WINDOW):
+    """Per-club statistics of both sanctions datasets, computed for all clubs at once.
+
+    Returns a dict with:
+      daily  - per source, club and day: the measures, their cumulative sums and
+               their sums over the last `window` days
+      totals - per source and club: the total of each measure, its rank among the
+               clubs of that source, its percentile and the sum over the last
+               `window` days of the dataset
+    """
+    combined = combine_sanctions(df_managers, df_adepts)
+    keys = ['source', 'club_group']
+
+    daily = combined.groupby(keys + ['date'])[MEASURES].sum().sort_index()
+    by_club = daily.groupby(level=keys)
+
+    cumulative = by_club.cumsum().add_prefix('cumulative_')
+    rolling = (daily.reset_index('date').groupby(level=keys)
+        .rolling(f"{window}D", on='date')[MEASURES].sum()
+        .reindex(daily.index)
+        .add_prefix('rolling_'))
+    daily = pd.concat([daily, cumulative, rolling], axis=1)
+
+    totals = by_club[MEASURES].sum()
+    by_source = totals.groupby(level='source')
+    ranks = by_source.rank(ascending=False, method='min').add_prefix('rank_')
+    percentiles = by_source.rank(pct=True).add_prefix('percentile_')
+
+    # Sanctions in the last `window` days of each source, the "current" rate
+    dates = daily.index.get_level_values('date')
+    last_date = pd.Series(dates).groupby(daily.index.get_level_values('source')).transform('max').values
+    recent = daily.loc[dates > last_date - pd.Timedelta(days=window), MEASURES]
+    recent = recent.groupby(level=keys).sum().reindex(totals.index, fill_value=0).add_prefix('recent_')
+
+    totals = pd.concat([totals, ranks, percentiles, recent], axis=1)
+    return {"daily": daily, "totals": totals, "window": window}
+
+
+def get_club_timeline(stats, source, club_name):
+    """Daily measures and cumulative series of one club"""
+    club_name = str(club_name).strip()
+    daily = stats["daily"]
+    if (source, club_name) not in daily.index.droplevel('date'):
+        return pd.DataFrame(columns=['date'] + list(daily.columns))
+    return daily.loc[(source, club_name)].reset_index()
+
+
+def get_club_totals(stats, source, club_name):
+    """Totals, rank and percentile of one club, or None if it has no sanctions"""
+    club_name = str(club_name).strip()
+    totals = stats["totals"]
+    if (source, club_name) not in totals.index:
+        return None
+    return totals.loc[(source, club_name)]
+
+
+def get_matrix(stats, source, measure='quantity', cumulative=False):
+    """Day by club matrix of a measure, carrying cumulative values forward"""
+    column = 'cumulative_' + measure if cumulative else measure
+    daily = stats["daily"]
+    if source not in daily.index.get_level_values('source'):
+        return pd.DataFrame()
+    matrix = daily.loc[source, column].unstack('club_group')
+    if cumulative:
+        return matrix.ffill().fillna(0)
+    return matrix.fillna(0)
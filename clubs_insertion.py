@@ -1,15 +1,17 @@
-from database.notion import get_results, create_page
-from config import parser_config
-import json
+from database.notion import get_results, create_page, update_page, archive_page
+from config import settings
+from jobs import run_job, forget
+from database.invalidation import notify_changed
+from database.geocoding import add_coordinates
+from database.decoding import load_json, dump_json
+import os
 import uuid
-import time
 
-CLUBS_DATABASE = parser_config('clubs_database_id')
 
 def get_clubs(): 
-    results = get_results(CLUBS_DATABASE)
+    results = get_results(settings['clubs_database_id'])
 
-    rows = results["result"]["results"]
+    rows = results["result"]
 
     clubs = []
     for row in rows:
@@ -22,34 +24,79 @@ def get_clubs():
         club_id = row["properties"]['ClubId']["title"][0]['text']['content']
         clubs.append({"row_id": row_id, "name": name, "city": city, "url": url, "img_url": img_url, "alias": alias, "club_id": club_id})
 
-    with open('clubs_db.json', 'w', encoding='utf8') as f:
-        json.dump(clubs, f, ensure_ascii=False, indent=4)
+    add_coordinates(clubs)
 
-def create_clubs():
+    dump_json(clubs, 'clubs_db.json')
+
+    return clubs
+
+CHANGES_FILE = 'clubs_changes.json'
 
-    with open('clubs_raw.json', 'r') as file:
-        clubs_rows = json.load(file)
+def club_properties(club):
+    return {
+        "Name": {"rich_text": [{"text": {"content": club['name']}}]},
+        "Website Url": {"rich_text": [{"text": {"content": club['url']}}]},
+        "City": {"rich_text": [{"text": {"content": club['city']}}]},
+        "Image Url": {"rich_text": [{"text": {"content": club['img_url']}}]},
+    }
 
-    for club in clubs_rows:
-        generated_uuid = uuid.uuid4().hex
-        #print(club)
+def create_clubs():
+    """Apply the club changes found by the scraper, or insert every club on a first run"""
+    if os.path.exists(CHANGES_FILE):
+        changes = load_json(CHANGES_FILE)
+    else:
+        changes = {"added": load_json('clubs_raw.json'), "modified": [], "removed": []}
+
+    def create_club(club):
+        # The id is derived from the club url so reinserting a club keeps its id
+        club_id = uuid.uuid5(uuid.NAMESPACE_URL, club['url']).hex
 
         data = {
-            "ClubId": {"title": [{"text": {"content": generated_uuid}}]},
-            "Name": {"rich_text": [{"text": {"content": club['name']}}]},
-            "Website Url": {"rich_text": [{"text": {"content": club['url']}}]},
-            "City": {"rich_text": [{"text": {"content": club['city']}}]},
-            "Image Url": {"rich_text": [{"text": {"content": club['img_url']}}]},
+            "ClubId": {"title": [{"text": {"content": club_id}}]},
             "Alias": {"rich_text": [{"text": {"content": ""}}]},
+            **club_properties(club),
         }
-        #print(data)
-        response = create_page(data, CLUBS_DATABASE)
-        print(club["name"] + "..." + str(response['statusCode']))
-        if response['success'] == False:
-            print("Error...")
-            #print(response)
-            break
-        time.sleep(1)
-
-#create_clubs()
-get_clubs()
\ No newline at end of file
+        response = create_page(data, settings['clubs_database_id'])
+        if response['success']:
+            # A club created again can be changed or removed again
+            forget("update_clubs", club['url'] + "#", prefix=True)
+            forget("remove_clubs", club['url'] + "#", prefix=True)
+        return response
+
+    rows_by_url = {}
+    if changes["modified"] or changes["removed"]:
+        rows_by_url = {club['url']: club['row_id'] for club in get_clubs()}
+
+    def update_club(club):
+        if club['url'] not in rows_by_url:
+            return create_club(club)
+        return update_page(club_properties(club), rows_by_url[club['url']])
+
+    def remove_club(club):
+        if club['url'] not in rows_by_url:
+            return {"success": True, "statusCode": 404}
+        response = archive_page(rows_by_url[club['url']])
+        if response['success']:
+            # A removed club scraped again under the same url is created again
+            forget("create_clubs", club['url'])
+        return response
+
+    # Changes are keyed with the fingerprint so a club changed again is applied
+    # again. Insertions keep the url as key, as in the journals of the first
+    # runs, so a club is never inserted twice
+    def club_key(club):
+        return club['url'] + "#" + "|".join(club[key] for key in ("name", "city", "img_url"))
+
+    results = [
+        run_job("create_clubs", changes["added"], lambda club: club['url'], create_club),
+        run_job("update_clubs", changes["modified"], club_key, update_club),
+        run_job("remove_clubs", changes["removed"], club_key, remove_club),
+    ]
+    if sum(result["done"] for result in results) > 0:
+        notify_changed("clubs_info")
+    if sum(result["failed"] for result in results) == 0 and os.path.exists(CHANGES_FILE):
+        os.replace(CHANGES_FILE, CHANGES_FILE + ".applied")
+
+if __name__ == "__main__":
+    #create_clubs()
+    get_clubs()
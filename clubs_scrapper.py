@@ -1,13 +1,21 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
+import hashlib
 import json
+import os
+import requests
+from club_images import download_images
 import time
 
 URL = 'https://afporto.pt/instituicao/clubes/page/'
+PAGES = range(1, 27)
+STATE_FILE = 'clubs_scrape_state.json'
+CHANGES_FILE = 'clubs_changes.json'
+
+driver = None
 
 def getClubs(html):
-    html = driver.page_source
     soup = BeautifulSoup(html, 'html.parser')
     #table = soup.find('div', class_='row')
     #print("table", table)
@@ -25,21 +33,129 @@ def getClubs(html):
     return rows
 
 def saveData(rows):
-    with open('clubs_raw.json', 'w') as f: 
+    with open('clubs_raw.json', 'w') as f:
         json.dump(rows, f, indent=4)
 
-if __name__ == "__main__":
-    options = Options()
-    options.headless = True 
-    driver = webdriver.Chrome(options=options)
+def loadJson(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def fingerprint(club):
+    """Hash of the fields of a club that are inserted in Notion"""
+    content = "|".join(club[key] for key in ("name", "url", "city", "img_url"))
+    return hashlib.sha1(content.encode('utf8')).hexdigest()
+
+def pageHash(rows):
+    return hashlib.sha1(json.dumps(rows, sort_keys=True).encode('utf8')).hexdigest()
+
+def renderPage(page):
+    """Rows of a listing page rendered in the browser, for pages built by scripts"""
+    global driver
+    if driver is None:
+        options = Options()
+        options.headless = True
+        driver = webdriver.Chrome(options=options)
+    driver.get(URL + str(page))
+    time.sleep(3)
+    return getClubs(driver.page_source)
+
+def fetchPage(page, page_state):
+    """Rows of a listing page, or None when the server says it is unchanged"""
+    headers = {}
+    if page_state.get("etag"):
+        headers["If-None-Match"] = page_state["etag"]
+    if page_state.get("last_modified"):
+        headers["If-Modified-Since"] = page_state["last_modified"]
+
+    response = requests.get(URL + str(page), headers=headers, timeout=30)
+    if response.status_code == 304:
+        return None, page_state
+    response.raise_for_status()
+
+    rows = getClubs(response.text)
+    if not rows:
+        rows = renderPage(page)
+    new_state = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "hash": pageHash(rows),
+        "clubs": [row["url"] for row in rows],
+    }
+    # Only the club cards are hashed, the rest of the page changes on every request
+    if new_state["hash"] == page_state.get("hash"):
+        return None, new_state
+    return rows, new_state
+
+def mergeChanges(pending, changes):
+    """Merge new changes into the ones not yet applied by clubs_insertion"""
+    if not pending:
+        return changes
+    merged = {kind: {club["url"]: club for club in pending[kind]} for kind in ("added", "modified", "removed")}
+    for kind in ("added", "modified", "removed"):
+        for club in changes[kind]:
+            url = club["url"]
+            was_added = url in merged["added"]
+            for clubs in merged.values():
+                clubs.pop(url, None)
+            if kind == "modified" and was_added:
+                merged["added"][url] = club
+            elif not (kind == "removed" and was_added):
+                merged[kind][url] = club
+    return {kind: list(clubs.values()) for kind, clubs in merged.items()}
+
+def scrape():
+    """Rescrape the listing, skipping unchanged pages, and write the club changes"""
+    state = loadJson(STATE_FILE, {"pages": {}, "clubs": {}})
+    previous = {club["url"]: club for club in loadJson('clubs_raw.json', [])}
+    if not state["clubs"]:
+        # The clubs of a scrape made before change detection are already inserted
+        state["clubs"] = {url: fingerprint(club) for url, club in previous.items()}
     data = []
-    for page in range(1,27) : 
-        driver.get(URL + str(page))
-        time.sleep(3)
-        html = driver.page_source
-        rows = getClubs(html)
+    complete = True
+    for page in PAGES:
+        page_state = state["pages"].get(str(page), {})
+        try:
+            rows, page_state = fetchPage(page, page_state)
+        except requests.RequestException as error:
+            print("Error page " + str(page) + "...", error)
+            complete = False
+            rows = None
+        if rows is None:
+            # Unchanged or unavailable, the clubs of the last scrape are kept
+            rows = [previous[url] for url in page_state.get("clubs", []) if url in previous]
+            print("page " + str(page) + "...unchanged")
+        state["pages"][str(page)] = page_state
         data.extend(rows)
-    driver.quit()
+
+    if driver is not None:
+        driver.quit()
+
+    fingerprints = {club["url"]: fingerprint(club) for club in data}
+    changes = {
+        "added": [club for club in data if club["url"] not in state["clubs"]],
+        "modified": [club for club in data if club["url"] in state["clubs"] and state["clubs"][club["url"]] != fingerprints[club["url"]]],
+        "removed": [previous[url] for url in state["clubs"] if url not in fingerprints and url in previous],
+    }
+    if complete:
+        state["clubs"] = fingerprints
+    else:
+        # Clubs missing because a page failed are not reported as removed
+        changes["removed"] = []
+        state["clubs"].update(fingerprints)
+    print(f"{len(changes['added'])} added, {len(changes['modified'])} modified, {len(changes['removed'])} removed")
 
     saveData(data)
-    
\ No newline at end of file
+    if any(changes.values()):
+        with open(CHANGES_FILE, 'w') as f:
+            json.dump(mergeChanges(loadJson(CHANGES_FILE, None), changes), f, indent=4)
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=4)
+
+    # Every crest is checked, an image can change without its url changing
+    download_images([club['img_url'] for club in data])
+    return changes
+
+if __name__ == "__main__":
+    scrape()
@@ -0,0 +1,275 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from config import settings
+from jobs import run_job
+from database.notion import create_page
+from database.invalidation import notify_changed
+import datetime
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+import uuid
+
+ROWS_FILE = 'communiques_rows.jsonl'
+LOAD_RATE = 3  # Requests per second, the average Notion allows
+EXTENSIONS = ('.html', '.htm', '.pdf')
+
+# Section headings of the communiqués and the dataset their sanctions go to
+SECTIONS = [
+    (re.compile(r'\b(DIRIGENTES?|TREINADOR(?:ES)?|AGENTES DESPORTIVOS|DELEGADOS?)\b'), "managers"),
+    (re.compile(r'\b(PUBLICO|ESPECTADORES|ADEPTOS)\b'), "adepts"),
+]
+
+MONTHS = {
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARCO": 3, "ABRIL": 4, "MAIO": 5, "JUNHO": 6,
+    "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9, "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12,
+}
+
+DATE_PATTERNS = [
+    re.compile(r'\b(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})\b'),
+    re.compile(r'\b(\d{1,2}) DE (' + '|'.join(MONTHS) + r') DE (\d{4})\b'),
+]
+FORMATION_PATTERN = re.compile(r'\b(?:S|SUB-?\s?)(\d{1,2})\b')
+SUSPENSION_PATTERN = re.compile(r'(\d+)\s*DIAS?\b')
+FINE_PATTERN = re.compile(r'MULTA\D{0,10}?(\d{1,3}(?:[.\s]\d{3})*(?:,\d{1,2})?)\s*(?:€|EUR)|(\d{1,3}(?:[.\s]\d{3})*(?:,\d{1,2})?)\s*(?:€|EUR)')
+
+known_clubs = []
+
+def normalize(text):
+    """Upper case text without accents or repeated spaces, for matching"""
+    text = unicodedata.normalize('NFKD', text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', text).strip().upper()
+
+def load_known_clubs():
+    """Club groups already in the sanctions databases, plus the club directory names and aliases"""
+    names = set()
+    for path in ('sanctions_managers_db.json', 'sanctions_adepts_db.json'):
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf8') as file:
+                names.update(sanction['club_group'] for sanction in json.load(file))
+    clubs = {name: name for name in names}
+    if os.path.exists('clubs_db.json'):
+        with open('clubs_db.json', 'r', encoding='utf8') as file:
+            for club in json.load(file):
+                group = club['alias'] or club['name']
+                clubs.setdefault(club['name'], group)
+                if club['alias']:
+                    clubs.setdefault(club['alias'], group)
+    # Longer names first so "FC PORTO B" is not matched as "FC PORTO"
+    return sorted(((normalize(name), group) for name, group in clubs.items() if name), key=lambda club: -len(club[0]))
+
+def init_worker(clubs):
+    known_clubs[:] = clubs
+
+def read_html(path):
+    from bs4 import BeautifulSoup
+
+    with open(path, 'r', encoding='utf8', errors='replace') as file:
+        soup = BeautifulSoup(file.read(), 'html.parser')
+    # Table rows are kept on a single line so each sanction stays together
+    for tr in soup.find_all('tr'):
+        tr.replace_with(" | ".join(cell.get_text(" ", strip=True) for cell in tr.find_all(['td', 'th'])) + "\n")
+    return soup.get_text("\n")
+
+def read_pdf(path):
+    # pypdf is only needed when the archive has PDF communiqués
+    from pypdf import PdfReader
+
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+def read_document(path):
+    if path.lower().endswith('.pdf'):
+        return read_pdf(path)
+    return read_html(path)
+
+def parse_date(text):
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            day, month, year = match.groups()
+            month = MONTHS[month] if month in MONTHS else int(month)
+            try:
+                return datetime.date(int(year), month, int(day)).isoformat()
+            except ValueError:
+                continue
+    return None
+
+def parse_amount(value):
+    return float(re.sub(r'[.\s]', '', value).replace(',', '.'))
+
+def find_club(line):
+    for name, group in known_clubs:
+        if re.search(r'(?<!\w)' + re.escape(name) + r'(?!\w)', line):
+            return group
+    return None
+
+def parse_line(line, kind, date):
+    """Sanction row of a communiqué line, or None when the line is not a sanction"""
+    suspension = SUSPENSION_PATTERN.search(line)
+    fine = FINE_PATTERN.search(line)
+    if suspension is None and fine is None:
+        return None
+    club_group = find_club(line)
+    if club_group is None:
+        return None
+    formation = FORMATION_PATTERN.search(line)
+
+    row = {
+        "club_group": club_group,
+        "quantity": 1,
+        "formation": "S" + formation.group(1) if formation else "NA",
+        "fines": parse_amount(fine.group(1) or fine.group(2)) if fine else 0,
+        "date": parse_date(line) or date,
+    }
+    if kind == "managers":
+        row["suspension_days"] = int(suspension.group(1)) if suspension else 0
+    return row
+
+def sanction_id(kind, row, line, occurrence):
+    """Id of a sanction derived from its content: the dataset, club, date and text of its line.
+
+    A corrected or re-exported communiqué keeps the ids of its unchanged
+    sanctions even when their line numbers move, so reloading it creates no
+    duplicates. Identical lines of one document are told apart by their
+    occurrence.
+    """
+    content = "|".join([kind, row["club_group"], row["date"], line, str(occurrence)])
+    return uuid.uuid5(uuid.NAMESPACE_URL, content).hex
+
+def parse_communique(path):
+    """Sanction rows of a communiqué, each tagged with its dataset and position in the document"""
+    text = read_document(path)
+    lines = [normalize(line) for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    document_date = next((date for date in map(parse_date, lines) if date), None)
+
+    rows = []
+    occurrences = {}
+    kind = None
+    for number, line in enumerate(lines):
+        heading = next((section for pattern, section in SECTIONS if pattern.search(line)), None)
+        # Headings are short lines, sanctions may also mention a coach or the public
+        if heading and len(line) < 60 and not SUSPENSION_PATTERN.search(line):
+            kind = heading
+            continue
+        if kind is None:
+            continue
+        row = parse_line(line, kind, document_date)
+        if row is None or row["date"] is None:
+            continue
+        source = os.path.basename(path)
+        occurrence = occurrences[kind, line] = occurrences.get((kind, line), -1) + 1
+        row["sanction_id"] = sanction_id(kind, row, line, occurrence)
+        rows.append({"dataset": kind, "source": source, "line": number, **row})
+    return path, rows
+
+def list_documents(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(EXTENSIONS)
+    )
+
+def read_rows_file(rows_file):
+    """Sanction rows and document markers of a rows file"""
+    with open(rows_file, 'r', encoding='utf8') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def parsed_sources(rows_file):
+    """Documents already parsed: the ones with a marker line, including those without
+    any sanction, and the sources of rows written before markers existed"""
+    if not os.path.exists(rows_file):
+        return set()
+    return {line.get("document") or line["source"] for line in read_rows_file(rows_file)}
+
+def parse_communiques(directory, rows_file=ROWS_FILE, workers=None, force=False):
+    """Parse the communiqués of a directory in a process pool, streaming the rows to a JSONL file.
+
+    Documents already in the rows file are skipped unless force is set, so an
+    interrupted run picks up where it stopped.
+    """
+    if force and os.path.exists(rows_file):
+        os.remove(rows_file)
+    done = parsed_sources(rows_file)
+    paths = [path for path in list_documents(directory) if os.path.basename(path) not in done]
+    print(f"parse_communiques: {len(done)} done, {len(paths)} pending")
+
+    clubs = load_known_clubs()
+    total_rows = 0
+    start = time.time()
+    with open(rows_file, 'a', encoding='utf8') as output:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(clubs,)) as executor:
+            futures = [executor.submit(parse_communique, path) for path in paths]
+            for finished, future in enumerate(as_completed(futures), start=1):
+                try:
+                    path, rows = future.result()
+                except Exception as error:
+                    print("Error: ", error)
+                    continue
+                # A document is written whole, rows then its marker, so a partially
+                # parsed one is never skipped on resume
+                marker = {"document": os.path.basename(path), "rows": len(rows)}
+                output.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows + [marker]))
+                output.flush()
+                total_rows += len(rows)
+                print(f"parse_communiques: {finished}/{len(paths)} - {os.path.basename(path)}...{len(rows)} rows")
+
+    print(f"parse_communiques: {total_rows} rows in {time.time() - start:.1f}s")
+    return total_rows
+
+def sanction_properties(row):
+    data = {
+        "SanctionId": {"title": [{"text": {"content": row['sanction_id']}}]},
+        "Club Group": {"select": {"name": row['club_group']}},
+        "Quantity": {"number": row['quantity']},
+        "Formation": {"select": {"name": row['formation']}},
+        "Fines": {"number": row['fines']},
+        "Date": {"date": {"start": row['date']}},
+    }
+    if "suspension_days" in row:
+        data["Suspension Days"] = {"number": row['suspension_days']}
+    return data
+
+def load_communiques(rows_file=ROWS_FILE, workers=8, rate=LOAD_RATE):
+    """Insert the parsed rows in the sanctions databases, as resumable jobs.
+
+    Notion has no bulk insert: each row is one request, and the API allows an
+    average of 3 per second, so the load takes about rows / rate seconds
+    (20 minutes for 3600 rows). The workers only keep that rate when a
+    request is slow.
+    """
+    rows = [row for row in read_rows_file(rows_file) if "dataset" in row]
+
+    databases = {
+        "managers": ("sanctions_managers_database_id", "managers_sanctions"),
+        "adepts": ("sanctions_adepts_database_id", "adepts_sanctions"),
+    }
+    results = {}
+    for kind, (setting, dataset) in databases.items():
+        database_id = settings[setting]
+        result = run_job(
+            "ingest_" + kind,
+            [row for row in rows if row["dataset"] == kind],
+            lambda row: row['sanction_id'],
+            lambda row: create_page(sanction_properties(row), database_id),
+            workers=workers,
+            rate=rate,
+        )
+        if result["done"] > 0:
+            notify_changed(dataset)
+        results[kind] = result
+    return results
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "parse" and len(sys.argv) > 2:
+        parse_communiques(sys.argv[2], force="--force" in sys.argv)
+    elif command == "load":
+        load_communiques()
+    elif command == "ingest" and len(sys.argv) > 2:
+        parse_communiques(sys.argv[2], force="--force" in sys.argv)
+        load_communiques()
+    else:
+        print("Usage: python communiques_ingestion.py [parse <directory> [--force] | load | ingest <directory> [--force]]")
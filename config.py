@@ -1,9 +1,69 @@
 import configparser
+import os
+import sys
 
-config = configparser.ConfigParser()
-config.read('config.ini')
+
+class Settings:
+    """Configuration values, resolved on first access and then kept.
+
+    A value is looked up in the environment (upper-cased name), then in the
+    Streamlit secrets when running inside the app, then in config.ini [env],
+    and finally in the Streamlit secrets file for scripts without config.ini.
+    Nothing is read, and streamlit is not imported, until a value is needed.
+    """
+
+    def __init__(self, path='config.ini'):
+        self.path = path
+        self.config = None
+        self.values = {}
+
+    def read_config(self):
+        if self.config is None:
+            self.config = configparser.ConfigParser()
+            self.config.read(self.path)
+        return self.config
+
+    def read_secret(self, name):
+        try:
+            import streamlit as st
+            return st.secrets[name] if name in st.secrets else None
+        except Exception:
+            return None
+
+    def resolve(self, name):
+        if name.upper() in os.environ:
+            return os.environ[name.upper()]
+        if 'streamlit' in sys.modules:
+            value = self.read_secret(name)
+            if value is not None:
+                return value
+        config = self.read_config()
+        if config.has_option('env', name):
+            return config['env'][name]
+        return self.read_secret(name)
+
+    def get(self, name, default=None):
+        if name not in self.values:
+            self.values[name] = self.resolve(name)
+        value = self.values[name]
+        return default if value is None else value
+
+    def get_bool(self, name, default=False):
+        value = self.get(name, default)
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+
+    def __getitem__(self, name):
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+
+settings = Settings()
 
 
 def parser_config(cfg):
 
-    return config['env'][str(cfg)]
\ No newline at end of file
+    return settings[str(cfg)]
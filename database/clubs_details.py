@@ -1,58 +1,50 @@
 from database.notion import get_results, create_page
-import streamlit as st
+from database.geocoding import add_coordinates
+from config import settings
 import json
 import uuid
 import time
 
-CLUBS_DATABASE = st.secrets['clubs_database_id']
-CLUBS_ALIAS_DATABASE = st.secrets['clubs_alias_database_id']
 
 def get_clubs_contacts(): 
-    results = get_results(CLUBS_DATABASE)
+    return parse_clubs_contacts(get_results(settings['clubs_database_id'], schema="clubs_contacts"))
 
+def parse_clubs_contacts(results):
+    # The records are decoded by the "clubs_contacts" schema of database/decoding.py
     if results["success"] == False: 
         return {"response": [], "success": False}
 
-    rows = results["result"]
-
-    clubs = []
-    for row in rows:
-        row_id = row['id']
-        city = row["properties"]['City']["rich_text"][0]['text']['content']
-        name = row["properties"]['Name']["rich_text"][0]['text']['content']
-        url = row["properties"]['Website Url']["rich_text"][0]['text']['content']
-        img_url = row["properties"]['Image Url']["rich_text"][0]['text']['content']
-        alias_id = row["properties"]['Alias']['relation'][0]['id'] if len(row["properties"]['Alias']['relation']) > 0 else ""
-        club_id = row["properties"]['ClubId']["title"][0]['text']['content']
-        clubs.append({"row_id": row_id, "name": name, "city": city, "url": url, "img_url": img_url, "alias_id": alias_id, "club_id": club_id})
-
-    return {"response": clubs, "success": True}
+    return {"response": results["result"], "success": True}
 
 def get_clubs_alias(): 
-    results = get_results(CLUBS_ALIAS_DATABASE)
+    return parse_clubs_alias(get_results(settings['clubs_alias_database_id'], schema="clubs_alias"))
 
+def parse_clubs_alias(results):
+    # The records are decoded by the "clubs_alias" schema of database/decoding.py
     if results["success"] == False: 
         return {"response": [], "success": False}
 
-    rows = results["result"]
-
-    clubs = []
-    for row in rows:
-        alias_id = row['id']
-        club = row["properties"]['Club']["title"][0]['text']['content']
-        clubs.append({"alias_id": alias_id, "club": club})
-        # print({"alias_id": alias_id, "club": club})
-
-    return {"response": clubs, "success": True}
+    return {"response": results["result"], "success": True}
 
 def get_clubs_info():
     club_ref = {}
-    clubs_contacts = get_clubs_contacts()
-    clubs_alias = get_clubs_alias()
-
+    # Both databases are queried concurrently
+    from database.notion_async import get_results_many
+
+    clubs_database = settings['clubs_database_id']
+    clubs_alias_database = settings['clubs_alias_database_id']
+    results = get_results_many([clubs_database, clubs_alias_database], {
+        clubs_database: "clubs_contacts",
+        clubs_alias_database: "clubs_alias",
+    })
+    clubs_contacts = parse_clubs_contacts(results[clubs_database])
+    clubs_alias = parse_clubs_alias(results[clubs_alias_database])
+
+    alias_edited = {}
     if clubs_alias['success']:
         for club in clubs_alias['response']:
             club_ref[club['alias_id']] = club['club']
+            alias_edited[club['alias_id']] = club['last_edited_time']
     else:
         return {"response": [], "success": False}
 
@@ -60,6 +52,8 @@ def get_clubs_info():
         for club in clubs_contacts['response']:
             if 'alias_id' in club and club['alias_id'] != None and club['alias_id'] != "": 
                 club['alias'] = club_ref[club['alias_id']]
+                # Renaming the alias changes the club record, and so the dataset version
+                club['last_edited_time'] = max(club['last_edited_time'], alias_edited[club['alias_id']])
             else:
                 club["alias"] = ""
                 club["alias_id"] = ""
@@ -67,7 +61,8 @@ def get_clubs_info():
     else:
         return {"response": [], "success": False}
 
-    return {"response": clubs_contacts["response"], "success": True}
+    # Coordinates are resolved once here so maps never geocode per view
+    return {"response": add_coordinates(clubs_contacts["response"]), "success": True}
 
 # get_clubs_contacts()
 # get_clubs_alias()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import pandas as pd
+import database.adepts_sanctions
+import database.managers_sanctions
+import database.clubs_details
+import database.invalidation
+from database.decoding import load_json
+
+# Every dataset the dashboard can show: how to fetch it and which local
+# snapshot to use when Notion is not available
+DATASETS = {
+    "managers_sanctions": {
+        "loader": database.managers_sanctions.get_sanctions,
+        "fallback": "sanctions_managers_db.json",
+        "id": "page_id",
+    },
+    "adepts_sanctions": {
+        "loader": database.adepts_sanctions.get_sanctions,
+        "fallback": "sanctions_adepts_db.json",
+        "id": "page_id",
+    },
+    "clubs_info": {
+        "loader": database.clubs_details.get_clubs_info,
+        "fallback": None,
+        "id": "row_id",
+    },
+}
+
+def fetch_dataset(type):
+    """Fetch the raw rows of a dataset from Notion, with the version of what will be shown.
+
+    When the fetch fails, the version is the one of the local snapshot
+    build_dataframe falls back to.
+    """
+    if type not in DATASETS:
+        return {"response": [], "success": False, "version": "empty"}
+    response = DATASETS[type]["loader"]()
+    if response.get('success') == True:
+        response["version"] = get_records_version(type, response['response'])
+    elif DATASETS[type]["fallback"] and os.path.exists(DATASETS[type]["fallback"]):
+        response["version"] = "fallback-" + get_records_version(type, load_json(DATASETS[type]["fallback"]))
+    else:
+        response["version"] = "empty"
+    return response
+
+def build_dataframe(type, response):
+    """Build the DataFrame of a dataset from a fetch response"""
+    if response.get('success') == True:
+        df = pd.DataFrame(response['response'])
+    elif type in DATASETS and DATASETS[type]["fallback"]:
+        df = pd.DataFrame(load_json(DATASETS[type]["fallback"]))
+    else:
+        df = pd.DataFrame()
+
+    if 'date' in df:
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
+def load_dataframe(type):
+    return build_dataframe(type, fetch_dataset(type))
+
+def load_dataset(type):
+    """DataFrame of a dataset and its version"""
+    response = fetch_dataset(type)
+    return build_dataframe(type, response), response["version"]
+
+def get_records_version(type, records):
+    """Fingerprint of a dataset: its invalidation counter and a hash of its rows.
+
+    The rows are hashed whole, last_edited_time included. last_edited_time
+    alone is not enough: Notion rounds it to the minute, so an edit made in
+    the minute of the previous fetch would keep the version. The counter
+    makes a notify_changed always give a new version, even when the rows
+    fetched right after look the same.
+    """
+    counter = database.invalidation.get_version(type)
+    if not records:
+        return f"{counter}-empty"
+    id_key = DATASETS[type]["id"]
+    digest = hashlib.sha1()
+    for record in sorted(records, key=lambda record: record[id_key]):
+        digest.update(json.dumps(record, sort_keys=True, default=str).encode('utf8'))
+        digest.update(b"\n")
+    return f"{counter}-{digest.hexdigest()}"
@@ -0,0 +1,211 @@
+import json
+
+# msgspec decodes the responses straight into typed structs, orjson is a
+# faster drop-in for json.loads, and the stdlib json works everywhere
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = [name for name, module in (("msgspec", msgspec), ("orjson", orjson)) if module is not None] + ["json"]
+BACKEND = BACKENDS[0]
+
+# Records built from each Notion database: the record key of the page id,
+# then record key -> (Notion property, property type), in record order.
+# Every record also gets the last_edited_time of its page, which the
+# dataset versions are computed from (see database/datasets.py)
+SCHEMAS = {
+    "managers_sanctions": {
+        "id": "page_id",
+        "properties": {
+            "sanction_id": ("SanctionId", "title"),
+            "club_group": ("Club Group", "select"),
+            "quantity": ("Quantity", "number"),
+            "suspension_days": ("Suspension Days", "number"),
+            "formation": ("Formation", "select"),
+            "fines": ("Fines", "number"),
+            "date": ("Date", "date"),
+        },
+    },
+    "adepts_sanctions": {
+        "id": "page_id",
+        "properties": {
+            "sanction_id": ("SanctionId", "title"),
+            "club_group": ("Club Group", "select"),
+            "quantity": ("Quantity", "number"),
+            "formation": ("Formation", "select"),
+            "fines": ("Fines", "number"),
+            "date": ("Date", "date"),
+        },
+    },
+    "clubs_contacts": {
+        "id": "row_id",
+        "properties": {
+            "name": ("Name", "rich_text"),
+            "city": ("City", "rich_text"),
+            "url": ("Website Url", "rich_text"),
+            "img_url": ("Image Url", "rich_text"),
+            "alias_id": ("Alias", "relation"),
+            "club_id": ("ClubId", "title"),
+        },
+    },
+    "clubs_alias": {
+        "id": "alias_id",
+        "properties": {
+            "club": ("Club", "title"),
+        },
+    },
+}
+
+
+def loads(content, backend=None):
+    """Decode a JSON document with the fastest available parser"""
+    backend = backend or BACKEND
+    if backend == "msgspec":
+        return msgspec.json.decode(content)
+    if backend == "orjson":
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def load_json(path):
+    with open(path, 'rb') as file:
+        return loads(file.read())
+
+
+def dump_json(data, path, indent=4):
+    """Write a snapshot, indented like the json.dump calls it replaces"""
+    if BACKEND == "msgspec":
+        content = msgspec.json.format(msgspec.json.encode(data), indent=indent)
+    elif BACKEND == "orjson" and indent == 2:
+        content = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        content = json.dumps(data, ensure_ascii=False, indent=indent).encode('utf8')
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def property_value(kind, value):
+    """Value of a Notion property decoded as a dict"""
+    if kind in ("title", "rich_text"):
+        items = value[kind]
+        return items[0]['text']['content'] if items and 'text' in items[0] else ""
+    if kind == "select":
+        return value['select']['name'] if value['select'] else None
+    if kind == "number":
+        return value['number']
+    if kind == "date":
+        return value['date']['start'][:10] if value['date'] else None
+    if kind == "relation":
+        return value['relation'][0]['id'] if value['relation'] else ""
+    raise ValueError("Unknown property type " + kind)
+
+
+def parse_rows(rows, schema):
+    """Records of the rows of a query, for rows already decoded as dicts"""
+    spec = SCHEMAS[schema]
+    properties = spec["properties"].items()
+    return [
+        {
+            spec["id"]: row['id'],
+            **{key: property_value(kind, row['properties'][name]) for key, (name, kind) in properties},
+            "last_edited_time": row.get('last_edited_time', ""),
+        }
+        for row in rows
+    ]
+
+
+def struct_value(kind, value):
+    """Value of a Notion property decoded as a struct"""
+    if kind in ("title", "rich_text"):
+        items = getattr(value, kind)
+        return items[0].text.content if items and items[0].text else ""
+    if kind == "select":
+        return value.select.name if value.select else None
+    if kind == "number":
+        return value.number
+    if kind == "date":
+        return value.date.start[:10] if value.date else None
+    return value.relation[0].id if value.relation else ""
+
+
+decoders = {}
+
+def get_decoder(schema):
+    """msgspec decoder of a query response, built once per schema.
+
+    Only the properties of the schema are declared, so every other property
+    and field of the response is skipped without being decoded.
+    """
+    if schema not in decoders:
+        Text = msgspec.defstruct("Text", [("content", str, "")])
+        RichText = msgspec.defstruct("RichText", [("text", Text | None, None)])
+        Option = msgspec.defstruct("Option", [("name", str, "")])
+        DateValue = msgspec.defstruct("DateValue", [("start", str, "")])
+        Relation = msgspec.defstruct("Relation", [("id", str)])
+        kinds = {
+            "title": msgspec.defstruct("Title", [("title", list[RichText], [])]),
+            "rich_text": msgspec.defstruct("RichTextProperty", [("rich_text", list[RichText], [])]),
+            "select": msgspec.defstruct("Select", [("select", Option | None, None)]),
+            "number": msgspec.defstruct("Number", [("number", int | float | None, None)]),
+            "date": msgspec.defstruct("Date", [("date", DateValue | None, None)]),
+            "relation": msgspec.defstruct("RelationProperty", [("relation", list[Relation], [])]),
+        }
+        properties = msgspec.defstruct("Properties", [
+            (key, kinds[kind], msgspec.field(name=name)) for key, (name, kind) in SCHEMAS[schema]["properties"].items()
+        ])
+        row = msgspec.defstruct("Row", [("id", str), ("properties", properties), ("last_edited_time", str, "")])
+        response = msgspec.defstruct("QueryResponse", [("results", list[row]), ("next_cursor", str | None, None)])
+        decoders[schema] = msgspec.json.Decoder(response)
+    return decoders[schema]
+
+
+def decode_query(content, schema, backend=None):
+    """Records and next cursor of a database query response body"""
+    backend = backend or BACKEND
+    if backend != "msgspec":
+        result = loads(content, backend)
+        return parse_rows(result["results"], schema), result.get('next_cursor', None)
+
+    spec = SCHEMAS[schema]
+    properties = spec["properties"].items()
+    result = get_decoder(schema).decode(content)
+    records = [
+        {
+            spec["id"]: row.id,
+            **{key: struct_value(kind, getattr(row.properties, key)) for key, (name, kind) in properties},
+            "last_edited_time": row.last_edited_time,
+        }
+        for row in result.results
+    ]
+    return records, result.next_cursor
+
+
+cursor_decoder = []
+
+def split_query(content, schema=None, backend=None):
+    """Next cursor of a query response body, and a function building its records.
+
+    With msgspec only next_cursor is decoded up front, so the next page can be
+    requested before the records of this one are built. Without a schema the
+    records are the raw rows.
+    """
+    backend = backend or BACKEND
+    if backend == "msgspec":
+        if not cursor_decoder:
+            Cursor = msgspec.defstruct("Cursor", [("next_cursor", str | None, None)])
+            cursor_decoder.append(msgspec.json.Decoder(Cursor))
+        next_cursor = cursor_decoder[0].decode(content).next_cursor
+        if schema:
+            return next_cursor, lambda: decode_query(content, schema, backend)[0]
+        return next_cursor, lambda: loads(content, backend)["results"]
+
+    result = loads(content, backend)
+    if schema:
+        return result.get('next_cursor', None), lambda: parse_rows(result["results"], schema)
+    return result.get('next_cursor', None), lambda: result["results"]
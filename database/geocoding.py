@@ -0,0 +1,71 @@
+import json
+import os
+import re
+import unicodedata
+
+GAZETTEER_FILE = "gazetteer.json"
+CACHE_FILE = "geocode_cache.json"
+
+def normalize_address(address):
+    """Lowercase, accent and punctuation free form of an address"""
+    text = unicodedata.normalize("NFKD", str(address or ""))
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+def load_gazetteer(path=GAZETTEER_FILE):
+    """Places by normalized name, most specific first: parishes, then longer names"""
+    with open(path, 'r', encoding='utf8') as file:
+        places = json.load(file)
+    places = sorted(places, key=lambda place: (place["type"] == "municipality", -len(place["name"])))
+    gazetteer = {}
+    for place in places:
+        gazetteer.setdefault(normalize_address(place["name"]), (place["latitude"], place["longitude"]))
+    return gazetteer
+
+def load_cache(path=CACHE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf8') as file:
+        return json.load(file)
+
+def save_cache(cache, path=CACHE_FILE):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+def resolve(address, gazetteer):
+    """Coordinates of the most specific gazetteer place named in an address"""
+    if address in gazetteer:
+        return gazetteer[address]
+    padded = " " + address + " "
+    for name in gazetteer:
+        if " " + name + " " in padded:
+            return gazetteer[name]
+    return None
+
+def geocode(addresses, gazetteer_path=GAZETTEER_FILE, cache_path=CACHE_FILE):
+    """Coordinates of each address, looked up in the cache before the gazetteer"""
+    cache = load_cache(cache_path)
+    normalized = {address: normalize_address(address) for address in addresses}
+    # Unresolved addresses are retried in case the gazetteer was extended
+    missing = {key for key in normalized.values() if key and cache.get(key) is None}
+
+    if missing:
+        gazetteer = load_gazetteer(gazetteer_path)
+        resolved = {key: resolve(key, gazetteer) for key in missing}
+        if any(resolved.values()) or any(key not in cache for key in missing):
+            cache.update(resolved)
+            save_cache(cache, cache_path)
+
+    return {address: cache.get(key) for address, key in normalized.items()}
+
+def add_coordinates(clubs):
+    """Add latitude and longitude to club rows from their address or city"""
+    addresses = [club.get("address") or club.get("city") for club in clubs]
+    coordinates = geocode(set(address for address in addresses if address))
+    for club, address in zip(clubs, addresses):
+        location = coordinates.get(address) if address else None
+        club["latitude"] = location[0] if location else None
+        club["longitude"] = location[1] if location else None
+    return clubs
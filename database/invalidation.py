@@ -0,0 +1,77 @@
+import fcntl
+import json
+import os
+from config import settings
+
+VERSIONS_FILE = "data_versions.json"
+
+# Notion databases (by setting name) and the dataset each one feeds
+DATABASE_DATASETS = {
+    "sanctions_managers_database_id": "managers_sanctions",
+    "sanctions_adepts_database_id": "adepts_sanctions",
+    "clubs_database_id": "clubs_info",
+    "clubs_alias_database_id": "clubs_info",
+}
+
+cached = {"mtime": None, "versions": {}}
+
+def get_versions_file():
+    return settings.get("data_versions_file", VERSIONS_FILE)
+
+def read_versions(path):
+    try:
+        with open(path, 'r', encoding='utf8') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def get_version(dataset):
+    """Invalidation counter of a dataset, re-read only when the file changes"""
+    path = get_versions_file()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+    if mtime != cached["mtime"]:
+        cached["versions"] = read_versions(path)
+        cached["mtime"] = mtime
+    return cached["versions"].get(dataset, 0)
+
+def bump(dataset):
+    """Mark a dataset as changed, returning its new version"""
+    path = get_versions_file()
+    with open(path + ".lock", 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        versions = read_versions(path)
+        versions[dataset] = versions.get(dataset, 0) + 1
+        with open(path + ".tmp", 'w', encoding='utf8') as f:
+            json.dump(versions, f)
+        os.replace(path + ".tmp", path)
+    print(dataset + "...version " + str(versions[dataset]))
+    return versions[dataset]
+
+def dataset_for_database(database_id):
+    """Dataset fed by a Notion database id, or None"""
+    normalized = str(database_id).replace("-", "")
+    for setting, dataset in DATABASE_DATASETS.items():
+        if str(settings.get(setting, "")).replace("-", "") == normalized:
+            return dataset
+    return None
+
+def notify_changed(dataset):
+    """Tell the app a dataset changed, through the invalidation endpoint if one is set"""
+    url = settings.get("invalidation_url")
+    if not url:
+        return bump(dataset)
+
+    # The app reads versions on every rerun, only the scripts load requests
+    import requests
+
+    headers = {"X-Invalidation-Token": settings.get("invalidation_token", "")}
+    try:
+        response = requests.post(url, json={"dataset": dataset}, headers=headers, timeout=10)
+        print(dataset + "...invalidated " + str(response.status_code))
+        return response.json().get("version") if response.status_code == 200 else None
+    except requests.RequestException as error:
+        print("Error: ", error)
+        return None
@@ -1,44 +1,12 @@
-from database.notion import get_results, update_page, create_page
-import streamlit as st
-import json
-import uuid
-import time
-import datetime
+from database.notion import get_results
+from config import settings
 
-SANCTIONS_MANAGERS_DATABASE = st.secrets['sanctions_managers_database_id']
 
 def get_sanctions():
-    results = get_results(SANCTIONS_MANAGERS_DATABASE)
+    # Only the properties of the records are decoded, see database/decoding.py
+    results = get_results(settings['sanctions_managers_database_id'], schema="managers_sanctions")
 
     if results["success"] == False: 
-        return {"response": [], "": False}
+        return {"response": [], "success": False}
 
-    rows = results["result"]
-    #print(rows)
-
-    sanctions = []
-
-    for row in rows: 
-        page_id = row['id']
-        sanction_id = row["properties"]['SanctionId']["title"][0]['text']['content'] if len(row["properties"]['SanctionId']["title"]) > 0 else ""
-        club_group = row["properties"]['Club Group']["select"]['name']
-        quantity = row["properties"]['Quantity']["number"]
-        suspension_days = row["properties"]['Suspension Days']["number"]
-        formation = row["properties"]['Formation']["select"]['name']
-        fines = row["properties"]['Fines']["number"]
-        date = row["properties"]['Date']['date']["start"]
-        date = datetime.date.fromisoformat(date)
-        date = datetime.date.isoformat(date)
-        sanctions.append({
-            "page_id": page_id,
-            "sanction_id": sanction_id,
-            "club_group": club_group,
-            "quantity": quantity ,
-            "suspension_days": suspension_days ,
-            "formation": formation ,
-            "fines": fines ,
-            "date": date 
-        })
-
-    return {"response": sanctions, "success": True}
-    
\ No newline at end of file
+    return {"response": results["result"], "success": True}
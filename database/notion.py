@@ -1,21 +1,108 @@
-import requests
-import streamlit as st
+import gzip
+import hashlib
+import json
+import os
+import time
+from config import settings
+from database.decoding import decode_query, loads
 
-TOKEN = st.secrets['notion_api_secret']
-NOTION_API_URL = st.secrets['notion_api_url']
+DEFAULT_API_URL = "https://api.notion.com/v1/"
+CASSETTE_DIR = "cassettes"
 
-headers = {
-    "Authorization": "Bearer " + TOKEN, 
-    "Notion-Version": "2022-06-28", 
-    "Content-Type": "application/json" 
-}
+def get_cassette_mode():
+    """Cassette mode of the notion_cassette_mode setting: "record", "replay" or None.
 
-def get_results(database_id: str):
+    In record mode every request is sent and its response saved to a
+    cassette file. In replay mode nothing is sent: responses are read from
+    the cassettes, after notion_cassette_latency seconds, so a recorded run
+    can be repeated offline, e.g.
+        NOTION_CASSETTE_MODE=record python refresh_shared_data.py
+        NOTION_CASSETTE_MODE=replay streamlit run main.py
+    """
+    mode = settings.get('notion_cassette_mode')
+    return mode if mode in ("record", "replay") else None
 
-    if not NOTION_API_URL or not TOKEN:
+def get_api_url():
+    # Replayed requests are matched by path, any base URL does
+    return settings.get('notion_api_url') or (DEFAULT_API_URL if get_cassette_mode() == "replay" else None)
+
+def is_configured():
+    return bool(get_api_url() and (settings.get('notion_api_secret') or get_cassette_mode() == "replay"))
+
+def get_headers():
+    return {
+        "Authorization": "Bearer " + settings.get('notion_api_secret', ""), 
+        "Notion-Version": "2022-06-28", 
+        "Content-Type": "application/json" 
+    }
+
+class CassetteResponse:
+    """Recorded response, with the part of the requests/httpx response API used here"""
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    def json(self):
+        return loads(self.content)
+
+def cassette_path(method, url, payload):
+    """Cassette of a request, matched on the method, the path (database or page id) and the body (cursor)"""
+    path = url[len(get_api_url()):].strip("/")
+    body = json.dumps(payload or {}, sort_keys=True)
+    digest = hashlib.sha1(body.encode('utf8')).hexdigest()[:16]
+    name = method.lower() + "-" + path.replace("/", "_") + "-" + digest + ".json.gz"
+    return os.path.join(settings.get('notion_cassette_dir', CASSETTE_DIR), name)
+
+def record_cassette(method, url, payload, response):
+    path = cassette_path(method, url, payload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cassette = {
+        "method": method,
+        "path": url[len(get_api_url()):],
+        "body": payload or {},
+        "status_code": response.status_code,
+        "content": response.content.decode('utf8'),
+    }
+    with gzip.open(path + ".tmp", 'wt', encoding='utf8') as file:
+        json.dump(cassette, file, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+def replay_cassette(method, url, payload):
+    """Recorded response of a request, or a 404 error response when it was never recorded"""
+    path = cassette_path(method, url, payload)
+    if not os.path.exists(path):
+        print("No cassette for " + method + " " + url)
+        error = {"object": "error", "status": 404, "code": "cassette_not_found", "message": "No cassette " + path}
+        return CassetteResponse(404, json.dumps(error).encode('utf8'))
+    with gzip.open(path, 'rt', encoding='utf8') as file:
+        cassette = json.load(file)
+    return CassetteResponse(cassette["status_code"], cassette["content"].encode('utf8'))
+
+def get_replay_latency():
+    return float(settings.get('notion_cassette_latency', 0))
+
+def send(method, url, payload):
+    """Send a request to the API, through the cassettes when a cassette mode is set"""
+    mode = get_cassette_mode()
+    if mode == "replay":
+        time.sleep(get_replay_latency())
+        return replay_cassette(method, url, payload)
+    # Loaded on the first request, snapshots and shared data never send one
+    import requests
+
+    response = requests.request(method, url, json=payload, headers=get_headers())
+    if mode == "record":
+        record_cassette(method, url, payload, response)
+    return response
+
+def get_results(database_id: str, schema=None):
+    """Every row of a database, or with a schema of database.decoding, the records built from them"""
+
+    if not is_configured():
         return {"success": False, "statusCode": 500, "result": None, "error": {}}
     
-    url = NOTION_API_URL + "databases/" + database_id + "/query"
+    url = get_api_url() + "databases/" + database_id + "/query"
     print("Query URL " + url)
 
     status_code = 400
@@ -28,14 +115,18 @@ def get_results(database_id: str):
             "start_cursor": next_cursor
         } if next_cursor else {}
 
-        response = requests.post(url, json=data, headers=headers)
+        response = send("POST", url, data)
         status_code = response.status_code
         #response = requests.post(NOTION_API_URL.format(database_id=database_id), json=data, headers=headers)
 
         if response.status_code == 200:
-            result = response.json()
-            results.extend(result["results"])
-            next_cursor = result.get('next_cursor', None)
+            if schema:
+                records, next_cursor = decode_query(response.content, schema)
+                results.extend(records)
+            else:
+                result = loads(response.content)
+                results.extend(result["results"])
+                next_cursor = result.get('next_cursor', None)
             if not next_cursor:
                 break
         else:
@@ -53,11 +144,11 @@ def get_results(database_id: str):
     
     
 def create_page(data: dict, database_id: str):
-    url = NOTION_API_URL + "pages/"
+    url = get_api_url() + "pages/"
     payload = {"parent": {"database_id": database_id}, "properties": data}
 
     print(url)
-    response = requests.post(url, headers=headers, json=payload)
+    response = send("POST", url, payload)
 
     if response.status_code == 200:
         result = response.json()
@@ -69,11 +160,11 @@ def create_page(data: dict, database_id: str):
         return data
     
 def update_page(data: dict, page_id: str):
-    url = NOTION_API_URL + "pages/" + page_id
+    url = get_api_url() + "pages/" + page_id
     payload = {"properties": data}
 
     print(url)
-    response = requests.patch(url, headers=headers, json=payload)
+    response = send("PATCH", url, payload)
 
     if response.status_code == 200:
         result = response.json()
@@ -82,4 +173,20 @@ def update_page(data: dict, page_id: str):
     else:
         data = {"success": False, "statusCode": response.status_code, "result": None, "error": response.json()}
         print("Error: ", response.json())
-        return data
\ No newline at end of file
+        return data
+
+def archive_page(page_id: str):
+    url = get_api_url() + "pages/" + page_id
+    payload = {"archived": True}
+
+    print(url)
+    response = send("PATCH", url, payload)
+
+    if response.status_code == 200:
+        result = response.json()
+        data = {"success": True, "statusCode": response.status_code, "result": result}
+        return data
+    else:
+        data = {"success": False, "statusCode": response.status_code, "result": None, "error": response.json()}
+        print("Error: ", response.json())
+        return data
@@ -0,0 +1,87 @@
+import asyncio
+import httpx
+from database.notion import get_api_url, get_headers, is_configured, get_cassette_mode, get_replay_latency, record_cassette, replay_cassette
+from database.decoding import split_query
+
+RATE_LIMIT = 3  # Notion allows an average of 3 requests per second
+
+class RateLimiter:
+    """Spaces out requests so concurrent queries share one request rate"""
+
+    def __init__(self, rate=RATE_LIMIT):
+        self.interval = 1 / rate
+        self.next_time = 0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            if self.next_time > now:
+                await asyncio.sleep(self.next_time - now)
+                now = self.next_time
+            self.next_time = now + self.interval
+
+async def query_database(client, limiter, database_id: str, schema=None):
+    """Query every page of a database, same return contract as get_results.
+
+    The request for the next page is started as soon as the cursor of a page
+    is decoded (see database.decoding.split_query), and the records of the
+    page are built in a worker thread while that request is in flight.
+    """
+    if not is_configured():
+        return {"success": False, "statusCode": 500, "result": None, "error": {}}
+
+    url = get_api_url() + "databases/" + database_id + "/query"
+    print("Query URL " + url)
+
+    headers = get_headers()
+    mode = get_cassette_mode()
+
+    async def fetch(cursor):
+        data = {"start_cursor": cursor} if cursor else {}
+        if mode == "replay":
+            await asyncio.sleep(get_replay_latency())
+            return replay_cassette("POST", url, data)
+        await limiter.wait()
+        response = await client.post(url, json=data, headers=headers)
+        if mode == "record":
+            record_cassette("POST", url, data, response)
+        return response
+
+    results = []
+    request = asyncio.create_task(fetch(None))
+    while request is not None:
+        response = await request
+        if response.status_code != 200:
+            print("Error 400: ", response.json())
+            return {"success": False, "statusCode": response.status_code, "result": None, "error": response.json()}
+
+        next_cursor, build_records = split_query(response.content, schema)
+        request = asyncio.create_task(fetch(next_cursor)) if next_cursor else None
+        results.extend(await asyncio.to_thread(build_records))
+
+    return {"success": True, "statusCode": 200, "result": results}
+
+async def query_databases(database_ids, schemas=None, rate=RATE_LIMIT):
+    """Query several databases concurrently under one shared rate limit"""
+    schemas = schemas or {}
+    limiter = RateLimiter(rate)
+    async with httpx.AsyncClient(timeout=30) as client:
+        responses = await asyncio.gather(*[
+            query_database(client, limiter, database_id, schemas.get(database_id))
+            for database_id in database_ids
+        ])
+    return dict(zip(database_ids, responses))
+
+def get_results(database_id: str, schema=None):
+    """Blocking equivalent of database.notion.get_results"""
+    return get_results_many([database_id], {database_id: schema})[database_id]
+
+def get_results_many(database_ids, schemas=None, rate=RATE_LIMIT):
+    """Blocking call returning the get_results response of each database by id"""
+    try:
+        return asyncio.run(query_databases(database_ids, schemas, rate))
+    except httpx.HTTPError as error:
+        print("Error: ", error)
+        return {database_id: {"success": False, "statusCode": 500, "result": None, "error": {"message": str(error)}}
+            for database_id in database_ids}
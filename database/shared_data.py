@@ -0,0 +1,68 @@
+import json
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+SHARED_DATA_DIR = "shared_data"
+KEEP_VERSIONS = 3  # Older files are removed, workers may still map the previous ones
+
+def dataset_dir(type, directory=SHARED_DATA_DIR):
+    return os.path.join(directory, type)
+
+def pointer_path(type, directory=SHARED_DATA_DIR):
+    return os.path.join(dataset_dir(type, directory), "CURRENT")
+
+def current_version(type, directory=SHARED_DATA_DIR):
+    """Version of a dataset last published, or None"""
+    try:
+        with open(pointer_path(type, directory), 'r', encoding='utf8') as file:
+            return json.load(file)["version"]
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+def publish(type, df, version, directory=SHARED_DATA_DIR):
+    """Write a dataset version as an Arrow IPC file and make it the current one.
+
+    The file and the pointer are both written under a temporary name and
+    renamed, so readers see either the previous or the new version, whole.
+    """
+    folder = dataset_dir(type, directory)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, version + ".arrow")
+    if not os.path.exists(path):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(path + ".tmp", 'wb') as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path + ".tmp", path)
+
+    pointer = pointer_path(type, directory)
+    with open(pointer + ".tmp", 'w', encoding='utf8') as f:
+        json.dump({"version": version, "published_at": time.time()}, f)
+    os.replace(pointer + ".tmp", pointer)
+    remove_old_versions(type, directory)
+
+def remove_old_versions(type, directory=SHARED_DATA_DIR):
+    folder = dataset_dir(type, directory)
+    files = sorted(
+        (name for name in os.listdir(folder) if name.endswith(".arrow")),
+        key=lambda name: os.path.getmtime(os.path.join(folder, name)),
+        reverse=True
+    )
+    for name in files[KEEP_VERSIONS:]:
+        # Workers that still map the file keep reading it after the unlink
+        os.remove(os.path.join(folder, name))
+
+def load(type, version, directory=SHARED_DATA_DIR):
+    """Memory-map a dataset version as a DataFrame backed by the shared file.
+
+    Numeric and date columns without nulls are zero-copy views of the mapped
+    file and strings stay Arrow-backed, so workers share the page cache
+    instead of each holding a private copy.
+    """
+    path = os.path.join(dataset_dir(type, directory), version + ".arrow")
+    source = pa.memory_map(path, 'r')
+    table = ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, types_mapper={pa.string(): pd.StringDtype("pyarrow")}.get)
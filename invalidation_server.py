@@ -0,0 +1,142 @@
+import hashlib
+import hmac
+import json
+import os
+import sys
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import requests
+import database.invalidation
+from config import settings
+
+DATASETS = ["managers_sanctions", "adepts_sanctions", "clubs_info"]
+
+# Where the verification token of the Notion webhook is kept when the
+# notion_verification_token setting is not set
+VERIFICATION_TOKEN_FILE = "notion_verification_token"
+
+def get_verification_token():
+    token = settings.get("notion_verification_token")
+    if token:
+        return token
+    if os.path.exists(VERIFICATION_TOKEN_FILE):
+        with open(VERIFICATION_TOKEN_FILE, 'r', encoding='utf8') as file:
+            return file.read().strip() or None
+    return None
+
+def save_verification_token(token):
+    """Keep the token of the webhook handshake, unless one is already stored.
+
+    The first token wins: a later handshake, which anyone could send, does not
+    replace it. To subscribe again, delete the file first.
+    """
+    if get_verification_token():
+        print("Webhook verification token received, keeping the stored one")
+        return False
+    with open(VERIFICATION_TOKEN_FILE, 'w', encoding='utf8') as file:
+        file.write(token)
+    print("Webhook verification token saved to " + VERIFICATION_TOKEN_FILE + ", paste it in Notion to verify the webhook: " + token)
+    return True
+
+def is_valid_signature(signature, content):
+    """Check the X-Notion-Signature of a webhook event, the HMAC-SHA256 of the body keyed by the verification token"""
+    token = get_verification_token()
+    if not token or not signature:
+        return False
+    expected = "sha256=" + hmac.new(token.encode("utf8"), content, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+def is_admin_request(headers, address):
+    """Requests of the admin scripts carry the invalidation_token, or come from this host when none is set.
+
+    Behind a reverse proxy every request comes from this host, so set the
+    token there.
+    """
+    token = settings.get("invalidation_token")
+    if token:
+        return hmac.compare_digest(headers.get("X-Invalidation-Token") or "", token)
+    return address in ("127.0.0.1", "::1")
+
+def get_dataset(body):
+    """Dataset named by an invalidation request or a Notion webhook event"""
+    if body.get("dataset") in DATASETS:
+        return body["dataset"]
+    if body.get("database_id"):
+        return database.invalidation.dataset_for_database(body["database_id"])
+
+    # Notion webhook events: page events name their parent database,
+    # database events name the database itself
+    entity = body.get("entity") or {}
+    parent = (body.get("data") or {}).get("parent") or {}
+    if parent.get("type") in ("database", "data_source"):
+        return database.invalidation.dataset_for_database(parent.get("id"))
+    if entity.get("type") == "database":
+        return database.invalidation.dataset_for_database(entity.get("id"))
+    return None
+
+def refresh(dataset):
+    """Publish the new version right away when datasets are shared between workers"""
+    directory = settings.get("shared_data_dir")
+    if directory:
+        from refresh_shared_data import refresh_shared_data
+        refresh_shared_data(directory, [dataset])
+
+class InvalidationHandler(BaseHTTPRequestHandler):
+    def send_json(self, status_code, data):
+        content = json.dumps(data).encode("utf8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/invalidate":
+            return self.send_json(404, {"success": False, "error": "not found"})
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            content = self.rfile.read(length)
+            body = json.loads(content or b"{}")
+        except ValueError:
+            return self.send_json(400, {"success": False, "error": "invalid json"})
+
+        # Notion sends a verification token once when the webhook is created,
+        # before any event can be signed with it
+        if "verification_token" in body and "X-Notion-Signature" not in self.headers:
+            save_verification_token(body["verification_token"])
+            return self.send_json(200, {"success": True})
+
+        # Notion events are signed with the verification token, the admin
+        # scripts send the invalidation token instead
+        if "X-Notion-Signature" in self.headers:
+            if not is_valid_signature(self.headers["X-Notion-Signature"], content):
+                return self.send_json(403, {"success": False, "error": "invalid signature"})
+        elif not is_admin_request(self.headers, self.client_address[0]):
+            return self.send_json(403, {"success": False, "error": "invalid token"})
+
+        dataset = get_dataset(body)
+        if dataset is None:
+            return self.send_json(200, {"success": True, "dataset": None})
+
+        version = database.invalidation.bump(dataset)
+        refresh(dataset)
+        self.send_json(200, {"success": True, "dataset": dataset, "version": version})
+
+def serve(port=8503):
+    server = ThreadingHTTPServer(("", port), InvalidationHandler)
+    print("Listening for invalidations on port " + str(port))
+    server.serve_forever()
+
+def send(dataset, url="http://localhost:8503/invalidate"):
+    """Stand-in sender, posts the same request the admin scripts send"""
+    headers = {"X-Invalidation-Token": settings.get("invalidation_token", "")}
+    response = requests.post(url, json={"dataset": dataset}, headers=headers, timeout=10)
+    print(response.status_code, response.json())
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "send":
+        send(*sys.argv[2:4])
+    elif len(sys.argv) > 1 and sys.argv[1] != "serve":
+        print("Usage: python invalidation_server.py [serve [port] | send <dataset> [url]]")
+    else:
+        serve(int(sys.argv[2]) if len(sys.argv) > 2 else 8503)
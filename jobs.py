@@ -0,0 +1,141 @@
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+JOURNAL = "jobs_journal.db"
+
+def open_journal(path=JOURNAL):
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS items (
+            job TEXT NOT NULL,
+            item_key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            status_code INTEGER,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (job, item_key)
+        )
+    """)
+    return connection
+
+def get_completed(connection, job):
+    rows = connection.execute("SELECT item_key FROM items WHERE job = ? AND status = 'done'", (job,))
+    return {row[0] for row in rows}
+
+def record(connection, job, key, status, status_code):
+    connection.execute(
+        "INSERT OR REPLACE INTO items (job, item_key, status, status_code, updated_at) VALUES (?, ?, ?, ?, ?)",
+        (job, key, status, status_code, time.time())
+    )
+    connection.commit()
+
+class RateLimiter:
+    """Spaces out the requests of the workers of a job, like database.notion_async.RateLimiter"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_time = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.next_time > now:
+                time.sleep(self.next_time - now)
+                now = self.next_time
+            self.next_time = now + self.interval
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+def run_job(job, items, get_key, work, workers=3, delay=1, journal=JOURNAL, rate=None):
+    """Run work(item) on every item not completed by a previous run of the job.
+
+    work must return a Notion response ({"success": ..., "statusCode": ...}).
+    Each item is checkpointed in the journal as soon as it finishes, so an
+    interrupted or failed run resumes with the remaining items only. Each
+    worker waits `delay` seconds after a request to stay under the API limits,
+    or with a rate, the requests of all the workers start at most `rate` per
+    second, whatever their latency.
+    """
+    connection = open_journal(journal)
+    completed = get_completed(connection, job)
+    pending = [item for item in items if get_key(item) not in completed]
+    total = len(pending)
+    print(f"{job}: {len(completed)} done, {total} pending")
+    if total == 0:
+        connection.close()
+        return {"done": 0, "failed": 0}
+
+    limiter = RateLimiter(rate) if rate else None
+
+    def run(item):
+        if limiter:
+            limiter.wait()
+        try:
+            response = work(item)
+        except Exception as error:
+            print("Error: ", error)
+            response = {"success": False, "statusCode": None}
+        if not limiter:
+            time.sleep(delay)
+        return response
+
+    done = 0
+    failed = 0
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, item): get_key(item) for item in pending}
+        for future in as_completed(futures):
+            key = futures[future]
+            response = future.result()
+            if response['success']:
+                done += 1
+                record(connection, job, key, "done", response['statusCode'])
+            else:
+                failed += 1
+                record(connection, job, key, "failed", response['statusCode'])
+
+            finished = done + failed
+            elapsed = time.time() - start
+            rate = finished / elapsed if elapsed > 0 else 0
+            eta = (total - finished) / rate if rate > 0 else 0
+            print(f"{job}: {finished}/{total} ({failed} failed) {rate:.2f} items/s ETA {format_duration(eta)} - {key}...{response['statusCode']}")
+
+    connection.close()
+    print(f"{job}: finished in {format_duration(time.time() - start)}, {done} done, {failed} failed")
+    return {"done": done, "failed": failed}
+
+def job_status(job, journal=JOURNAL):
+    connection = open_journal(journal)
+    rows = connection.execute("SELECT status, COUNT(*) FROM items WHERE job = ? GROUP BY status", (job,)).fetchall()
+    connection.close()
+    return dict(rows)
+
+def forget(job, key, prefix=False, journal=JOURNAL):
+    """Forget an item of a job, or with prefix every item whose key starts with key, so it runs again"""
+    connection = open_journal(journal)
+    if prefix:
+        connection.execute("DELETE FROM items WHERE job = ? AND substr(item_key, 1, length(?)) = ?", (job, key, key))
+    else:
+        connection.execute("DELETE FROM items WHERE job = ? AND item_key = ?", (job, key))
+    connection.commit()
+    connection.close()
+
+def reset_job(job, journal=JOURNAL):
+    """Forget the progress of a job so the next run starts over"""
+    connection = open_journal(journal)
+    connection.execute("DELETE FROM items WHERE job = ?", (job,))
+    connection.commit()
+    connection.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "status":
+        print(job_status(sys.argv[2]))
+    elif len(sys.argv) == 3 and sys.argv[1] == "reset":
+        reset_job(sys.argv[2])
+    else:
+        print("Usage: python jobs.py [status | reset] <job>")
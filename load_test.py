@@ -0,0 +1,432 @@
+import asyncio
+import datetime
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FORMATIONS = ["S8", "S9", "S11", "S15", "S17", "S19", "NA"]
+CLUB_MENU = ["Estatisticas", "Comparação", "Contactos"]
+
+
+def title(value):
+    return {"title": [{"text": {"content": value}}]}
+
+def rich_text(value):
+    return {"rich_text": [{"text": {"content": value}}]}
+
+def fake_databases(scale=1, seed=1):
+    """Notion rows for the fake backend, from the local managers snapshot repeated `scale` times"""
+    rng = random.Random(seed)
+    with open('sanctions_managers_db.json', 'r', encoding='utf8') as file:
+        managers = json.load(file)
+    clubs = sorted({sanction['club_group'] for sanction in managers})
+    edited = "2025-01-01T00:00:00.000Z"
+
+    databases = {"managers": [], "adepts": [], "clubs": [], "alias": []}
+    for copy in range(scale):
+        for sanction in managers:
+            date = datetime.date.fromisoformat(sanction['date']) - datetime.timedelta(days=365 * copy)
+            databases["managers"].append({"id": f"{sanction['page_id']}-{copy}", "last_edited_time": edited, "properties": {
+                "SanctionId": title(sanction['sanction_id']),
+                "Club Group": {"select": {"name": sanction['club_group']}},
+                "Quantity": {"number": sanction['quantity']},
+                "Suspension Days": {"number": sanction['suspension_days']},
+                "Formation": {"select": {"name": sanction['formation']}},
+                "Fines": {"number": sanction['fines']},
+                "Date": {"date": {"start": date.isoformat()}},
+            }})
+        for number in range(len(managers) // 2):
+            date = datetime.date(2024, 9, 1) + datetime.timedelta(days=rng.randint(0, 150) - 365 * copy)
+            databases["adepts"].append({"id": f"adepts-{copy}-{number}", "last_edited_time": edited, "properties": {
+                "SanctionId": title(""),
+                "Club Group": {"select": {"name": rng.choice(clubs)}},
+                "Quantity": {"number": 1},
+                "Formation": {"select": {"name": rng.choice(FORMATIONS)}},
+                "Fines": {"number": rng.choice([10, 25, 50, 100])},
+                "Date": {"date": {"start": date.isoformat()}},
+            }})
+
+    cities = ["Porto", "Maia", "Matosinhos", "Gondomar", "Valongo", "Vila Nova de Gaia"]
+    for number, club in enumerate(clubs):
+        databases["alias"].append({"id": f"alias-{number}", "last_edited_time": edited, "properties": {"Club": title(club)}})
+        databases["clubs"].append({"id": f"club-{number}", "last_edited_time": edited, "properties": {
+            "City": rich_text(cities[number % len(cities)]),
+            "Name": rich_text(club),
+            "Website Url": rich_text(f"https://afporto.pt/clube/{number}"),
+            "Image Url": rich_text(f"/images/{number}.png"),
+            "Alias": {"relation": [{"id": f"alias-{number}"}]},
+            "ClubId": title(f"club-{number}"),
+        }})
+    return databases, clubs
+
+def fake_image():
+    from PIL import Image
+
+    content = io.BytesIO()
+    Image.new("RGB", (400, 400), (0, 90, 160)).save(content, format="PNG")
+    return content.getvalue()
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+    """Database queries with cursor pagination, page updates and club crests"""
+
+    databases = {}
+    image = b""
+    latency = 0.0
+
+    def log_message(self, *args):
+        pass
+
+    def send_content(self, content, content_type="application/json"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        self.send_content(self.image, "image/png")
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.respond(self.path.strip("/").split("/"), body)
+
+    def respond(self, parts, body):
+        if "databases" not in parts:
+            return self.send_content(json.dumps({"object": "page", "id": "fake"}).encode("utf8"))
+
+        rows = self.databases.get(parts[parts.index("databases") + 1], [])
+        start = int(body.get("start_cursor") or 0)
+        page_size = int(body.get("page_size") or 100)
+        next_cursor = str(start + page_size) if start + page_size < len(rows) else None
+        result = {"object": "list", "results": rows[start:start + page_size], "next_cursor": next_cursor, "has_more": next_cursor is not None}
+        self.send_content(json.dumps(result).encode("utf8"))
+
+    do_PATCH = do_POST
+
+def start_fake_notion(scale=1, latency=0.0, handler=FakeNotionHandler):
+    """Serve the fake Notion API on a free local port, returning the settings that point at it"""
+    databases, clubs = fake_databases(scale)
+    handler.databases = databases
+    handler.image = fake_image()
+    handler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    # Crest urls are made absolute once the port is known
+    for row in databases["clubs"]:
+        url = row["properties"]["Image Url"]["rich_text"][0]["text"]["content"]
+        if url.startswith("/"):
+            row["properties"]["Image Url"] = rich_text(base_url + url)
+
+    # The environment comes first in the settings lookup of the app
+    environment = {
+        "NOTION_API_URL": base_url + "/v1/",
+        "NOTION_API_SECRET": "fake",
+        "SANCTIONS_MANAGERS_DATABASE_ID": "managers",
+        "SANCTIONS_ADEPTS_DATABASE_ID": "adepts",
+        "CLUBS_DATABASE_ID": "clubs",
+        "CLUBS_ALIAS_DATABASE_ID": "alias",
+        "DATA_VERSIONS_FILE": os.path.join(tempfile.mkdtemp(), "data_versions.json"),
+        "STATIC_SNAPSHOTS": "false",
+        "SHARED_DATA_DIR": "",
+    }
+    return server, clubs, environment
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(environment):
+    """Run main.py in a headless Streamlit server, as in production"""
+    port = free_port()
+    command = [
+        sys.executable, "-m", "streamlit", "run", "main.py",
+        "--server.headless", "true",
+        "--server.port", str(port),
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    process = subprocess.Popen(command, env={**os.environ, **environment}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(300):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The Streamlit server did not start")
+
+def process_cpu(pid):
+    """User and system CPU seconds of a process"""
+    with open(f"/proc/{pid}/stat", "r") as file:
+        fields = file.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def process_memory(pid, field="VmRSS"):
+    """Resident (VmRSS) or peak resident (VmHWM) memory of a process, in MB"""
+    with open(f"/proc/{pid}/status", "r") as file:
+        for line in file:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+class Session:
+    """A browser session, speaking the Streamlit websocket protocol to the server"""
+
+    def __init__(self, port):
+        self.port = port
+        self.connection = None
+        self.elements = []
+        self.widgets = {}
+        self.cache = {}
+
+    async def connect(self):
+        from tornado.websocket import websocket_connect
+
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = await websocket_connect(f"ws://127.0.0.1:{self.port}/_stcore/stream", subprotocols=["streamlit"])
+        self.widgets = {}
+
+    def resolve(self, message):
+        """The message a reference points to, from this session or the server cache"""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        if message.ref_hash not in self.cache:
+            url = f"http://127.0.0.1:{self.port}/_stcore/message?hash={message.ref_hash}"
+            cached = ForwardMsg()
+            cached.ParseFromString(urllib.request.urlopen(url, timeout=30).read())
+            self.cache[message.ref_hash] = cached
+        return self.cache[message.ref_hash]
+
+    async def rerun(self, widget_state=None):
+        """Send a rerun with the widget values of the page, waiting for the script to finish.
+
+        Returns the error shown by the app, if any, or the failed finish status
+        of the script, or "no elements rendered" for an empty page.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        back_message = BackMsg()
+        states = dict(self.widgets)
+        if widget_state is not None:
+            states[widget_state.id] = widget_state
+        back_message.rerun_script.widget_states.widgets.extend(states.values())
+        await self.connection.write_message(back_message.SerializeToString(), binary=True)
+
+        error = None
+        while True:
+            data = await self.connection.read_message()
+            if data is None:
+                return "connection closed"
+            message = ForwardMsg()
+            message.ParseFromString(data)
+            if message.ref_hash:
+                message = self.resolve(message)
+            elif message.metadata.cacheable:
+                self.cache[message.hash] = message
+
+            kind = message.WhichOneof("type")
+            if kind == "new_session":
+                # Every script run, including the ones started by st.rerun, redraws the page
+                self.elements = []
+                error = None
+            elif kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element = message.delta.new_element
+                self.elements.append(element)
+                if element.WhichOneof("type") == "exception":
+                    error = element.exception.message
+            elif kind == "script_finished":
+                status = message.script_finished
+                if status == ForwardMsg.ScriptFinishedStatus.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                # A script that failed to compile or run also finishes, with nothing drawn
+                if status != ForwardMsg.ScriptFinishedStatus.FINISHED_SUCCESSFULLY:
+                    error = error or "script " + ForwardMsg.ScriptFinishedStatus.Name(status)
+                break
+
+        # Only the widgets still on the page keep their values, as in the browser
+        present = {self.widget_id(element) for element in self.elements}
+        self.widgets = {id: state for id, state in states.items() if id in present and not state.HasField("trigger_value")}
+        if error is None and not self.elements:
+            error = "no elements rendered"
+        return error
+
+    def widget_id(self, element):
+        kind = element.WhichOneof("type")
+        return getattr(element, kind).id if kind in ("selectbox", "button") else None
+
+    def selectbox(self, key):
+        for element in self.elements:
+            if element.WhichOneof("type") == "selectbox" and element.selectbox.id.endswith("-" + key):
+                return element.selectbox
+        return None
+
+    def button(self, label):
+        for element in self.elements:
+            if element.WhichOneof("type") == "button" and element.button.label == label:
+                return element.button
+        return None
+
+def select(selectbox, option):
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    return WidgetState(id=selectbox.id, int_value=list(selectbox.options).index(option))
+
+def click(button):
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    return WidgetState(id=button.id, trigger_value=True)
+
+def next_action(session, rng):
+    """A user action available on the current page, as (name, widget state to send)"""
+    actions = []
+    club_selector = session.selectbox("club_selector")
+    if club_selector is not None:
+        clubs = [option for option in club_selector.options if option]
+        actions.append(("select_club", select(club_selector, rng.choice(clubs))))
+    navigation = session.selectbox("navigation")
+    if navigation is not None:
+        view = navigation.options[1 - navigation.default]
+        actions.append(("switch_view", select(navigation, view)))
+    club_menu = session.selectbox("key")
+    if club_menu is not None:
+        option = rng.choice(CLUB_MENU)
+        actions.append(("club_menu:" + option, select(club_menu, option)))
+    for label, name in (("Ver Mais", "see_more"), ("Voltar", "back")):
+        button = session.button(label)
+        if button is not None:
+            actions.append((name, click(button)))
+    # A visitor sometimes reloads the page, starting a new session
+    if not actions or rng.random() < 0.1:
+        return ("reload", None)
+    return rng.choice(actions)
+
+async def run_session(port, number, steps, think_time, reruns):
+    rng = random.Random(number)
+    session = Session(port)
+    await session.connect()
+    action, widget_state = "open", None
+    for step in range(steps + 1):
+        start = time.perf_counter()
+        try:
+            if action == "reload":
+                await session.connect()
+            error = await session.rerun(widget_state)
+        except Exception as exception:
+            error = str(exception)
+        reruns.append({"session": number, "action": action, "seconds": time.perf_counter() - start, "error": error})
+        if step == steps:
+            break
+        await asyncio.sleep(rng.uniform(0, think_time))
+        action, widget_state = next_action(session, rng)
+    return session
+
+async def run_sessions(port, pid, sessions, steps, think_time):
+    reruns = []
+    start = time.perf_counter()
+    cpu_start = process_cpu(pid)
+    opened = await asyncio.gather(*(run_session(port, number, steps, think_time, reruns) for number in range(sessions)))
+    wall = time.perf_counter() - start
+    cpu = process_cpu(pid) - cpu_start
+    # Measured before disconnecting, while the server holds every session
+    rss = process_memory(pid)
+    for session in opened:
+        session.connection.close()
+    return reruns, wall, cpu, rss
+
+def load_test(sessions=10, steps=20, scale=1, think_time=0.5, latency=0.0):
+    """Run `sessions` concurrent sessions of `steps` actions each against one app server and a fake Notion backend"""
+    notion, clubs, environment = start_fake_notion(scale, latency)
+    process, port = start_app(environment)
+    try:
+        # One warm-up session loads the datasets, so the test measures steady state
+        warmup, _, _, _ = asyncio.run(run_sessions(port, process.pid, 1, len(CLUB_MENU) * 3, 0))
+        baseline_rss = process_memory(process.pid)
+        reruns, wall, cpu, rss = asyncio.run(run_sessions(port, process.pid, sessions, steps, think_time))
+        peak_rss = process_memory(process.pid, "VmHWM")
+    finally:
+        process.terminate()
+        process.wait()
+        notion.shutdown()
+
+    report = {
+        "sessions": sessions,
+        "reruns": len(reruns),
+        "errors": sum(1 for rerun in reruns if rerun["error"]),
+        "wall_seconds": wall,
+        "reruns_per_second": len(reruns) / wall if wall else 0.0,
+        "cpu_seconds": cpu,
+        "cpu_seconds_per_session": cpu / sessions,
+        "cpu_utilization": cpu / wall if wall else 0.0,
+        "baseline_rss_mb": baseline_rss,
+        "rss_mb": rss,
+        "peak_rss_mb": peak_rss,
+        "rss_mb_per_session": (rss - baseline_rss) / sessions,
+        "latency": latency_report([rerun["seconds"] for rerun in reruns]),
+        "actions": {},
+        "first_errors": [rerun for rerun in reruns if rerun["error"]][:5],
+    }
+    for action in sorted({rerun["action"] for rerun in reruns}):
+        report["actions"][action] = latency_report([rerun["seconds"] for rerun in reruns if rerun["action"] == action])
+    return report
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def latency_report(seconds):
+    return {
+        "count": len(seconds),
+        "mean": statistics.mean(seconds) if seconds else 0.0,
+        "p50": percentile(seconds, 0.50),
+        "p90": percentile(seconds, 0.90),
+        "p95": percentile(seconds, 0.95),
+        "p99": percentile(seconds, 0.99),
+        "max": max(seconds) if seconds else 0.0,
+    }
+
+def print_report(report):
+    print(f"{report['sessions']} sessions, {report['reruns']} reruns ({report['errors']} errors) in {report['wall_seconds']:.1f}s, {report['reruns_per_second']:.1f} reruns/s")
+    print(f"server cpu: {report['cpu_seconds']:.1f}s total, {report['cpu_seconds_per_session']:.2f}s per session, {report['cpu_utilization']:.0%} of one core")
+    print(f"server memory: {report['baseline_rss_mb']:.0f} MB after warm-up, {report['rss_mb']:.0f} MB with every session open "
+          f"({report['rss_mb_per_session']:.1f} MB per session), {report['peak_rss_mb']:.0f} MB peak")
+    print(f"\n{'rerun latency (ms)':<24}{'count':>7}{'mean':>8}{'p50':>8}{'p90':>8}{'p95':>8}{'p99':>8}{'max':>8}")
+    rows = [("all", report["latency"])] + list(report["actions"].items())
+    for name, latency in rows:
+        values = "".join(f"{latency[key] * 1000:8.0f}" for key in ("mean", "p50", "p90", "p95", "p99", "max"))
+        print(f"{name:<24}{latency['count']:>7}{values}")
+    for rerun in report["first_errors"]:
+        print(f"error after {rerun['action']}: {rerun['error']}")
+
+if __name__ == "__main__":
+    try:
+        arguments = [float(argument) for argument in sys.argv[1:]]
+    except ValueError:
+        arguments = [-1]
+    if len(arguments) > 5 or any(argument < 0 for argument in arguments):
+        print("Usage: python load_test.py [sessions] [steps] [scale] [think_time] [latency]")
+        sys.exit(1)
+    defaults = [10, 20, 1, 0.5, 0.0]
+    sessions, steps, scale, think_time, latency = arguments + defaults[len(arguments):]
+    print_report(load_test(int(sessions), int(steps), int(scale), think_time, latency))
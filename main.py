@@ -1,20 +1,23 @@
 import streamlit as st
-import pandas as pd
+import functools
 import json
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-import database.adepts_sanctions
-import database.managers_sanctions
-import database.clubs_details
+import os
+import time
+import database.invalidation
+from config import settings
+from snapshot import VIEWS as SNAPSHOT_VIEWS, read_snapshot, snapshot_path
+
+# pandas, the datasets, the aggregations and the image cache (with requests)
+# are imported by the functions that use them, like plotly, so the first
+# elements of a page are sent before they are loaded
 
 # Set page configuration
 st.set_page_config(page_title="Análise de Castigos Clubes", layout="wide")
 
-data_gps = pd.DataFrame({
+data_gps = {
     'latitude': [41.16326520961089],
     'longitude': [-8.583252689196224]
-})
+}
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -28,20 +31,170 @@ def initialize_session_state():
 
 initialize_session_state()
 
-@st.cache_data(ttl=60)  # Cache for 1 minute
-def fetch_data_from_api(type):
+# Data is refetched when invalidated (see invalidation_server.py), and at
+# least this often as a safety net
+DATA_TTL = 60 * 60
+
+@st.cache_data(ttl=DATA_TTL, max_entries=12)
+def fetch_data_from_api(type, fetch_key):
     """Fetch data from API with caching"""
-    if type == "adepts_sanctions": 
-        response = database.adepts_sanctions.get_sanctions()
-    elif type == "managers_sanctions":
-        response = database.managers_sanctions.get_sanctions()
-    elif type == "clubs_info":
-        response = database.clubs_details.get_clubs_info()
-    else:
-        response = {"response": [], "success": False} 
-    return response
-
-def display_dataframe(df, height="auto", type="default"):
+    import database.datasets
+
+    return database.datasets.fetch_dataset(type)
+
+def get_fetch_key(type):
+    return (database.invalidation.get_version(type), int(time.time() // DATA_TTL))
+
+@st.cache_data(ttl=DATA_TTL, max_entries=12)
+def fetch_data_version(type, fetch_key):
+    # Kept apart so reruns read the version without copying the fetched rows
+    return fetch_data_from_api(type, fetch_key)["version"]
+
+def get_data_version(type):
+    """Current version of a dataset, as (source, version).
+
+    With shared_data_dir set, it is the version published there by
+    refresh_shared_data.py. Otherwise the dataset is fetched by this process
+    when invalidated or every DATA_TTL seconds, and the version is its
+    invalidation counter and the fingerprint of the rows fetched (see
+    database.datasets.get_records_version). A timed refetch that returns the
+    same rows keeps the version, so nothing keyed by it is recomputed.
+    """
+    directory = settings.get("shared_data_dir")
+    if directory:
+        import database.shared_data
+
+        version = database.shared_data.current_version(type, directory)
+        if version:
+            return ("shared", version)
+    return ("notion", fetch_data_version(type, get_fetch_key(type)))
+
+@st.cache_data(max_entries=12)
+def load_dataframe(type, version, _fetch_key):
+    """Build the DataFrame of a dataset, memoized per data version"""
+    import database.datasets
+
+    return database.datasets.build_dataframe(type, fetch_data_from_api(type, _fetch_key))
+
+@st.cache_resource(max_entries=12)
+def load_shared_dataframe(type, version):
+    """Memory-map a published dataset version, shared by every session of the process"""
+    import database.shared_data
+
+    return database.shared_data.load(type, version, settings.get("shared_data_dir"))
+
+def get_dataframe(type, version):
+    source, number = version
+    if source == "shared":
+        return load_shared_dataframe(type, number)
+    return load_dataframe(type, version, get_fetch_key(type))
+
+@st.cache_resource
+def load_club_aggregates(type):
+    """Club aggregates of a sanctions dataset, kept across versions of the dataset"""
+    from club_aggregates import ClubAggregates
+
+    return ClubAggregates()
+
+def get_aggregated_clubs(dataset, df, type="default"):
+    """Same as get_clubs_data, applying only the rows changed since the last version"""
+    aggregates = load_club_aggregates(dataset)
+    with aggregates.lock:
+        aggregates.sync(df)
+        return aggregates.clubs_data(type=type)
+
+def build_sanctions_chart(dataset, df, type="default"):
+    """Cumulative sanctions figure of the top 10 clubs, rebuilt only when the dataset changes"""
+    if df.empty:
+        return None
+    from analytics import create_cumulative_sanctions_chart
+
+    return create_cumulative_sanctions_chart(df, get_aggregated_clubs(dataset, df, type).head(10))
+
+def build_club_stats(df_managers, df_adepts):
+    from club_stats import compute_club_stats
+
+    return compute_club_stats(df_managers, df_adepts)
+
+def build_sanctions_cube(df_managers, df_adepts):
+    from sanctions_cube import build_cube
+
+    return build_cube(df_managers, df_adepts)
+
+# Datasets computed from other datasets
+DERIVED_DATASETS = {
+    "managers_clubs": {"build": functools.partial(get_aggregated_clubs, "managers_sanctions"), "datasets": ["managers_sanctions"]},
+    "adepts_clubs": {"build": functools.partial(get_aggregated_clubs, "adepts_sanctions", type="clubs"), "datasets": ["adepts_sanctions"]},
+    "managers_chart": {"build": functools.partial(build_sanctions_chart, "managers_sanctions"), "datasets": ["managers_sanctions"]},
+    "adepts_chart": {"build": functools.partial(build_sanctions_chart, "adepts_sanctions", type="clubs"), "datasets": ["adepts_sanctions"]},
+    "club_stats": {"build": build_club_stats, "datasets": ["managers_sanctions", "adepts_sanctions"]},
+    "sanctions_cube": {"build": build_sanctions_cube, "datasets": ["managers_sanctions", "adepts_sanctions"], "resource": True},
+}
+
+def build_derived(type, versions):
+    derived = DERIVED_DATASETS[type]
+    frames = [get_dataframe(name, version) for name, version in zip(derived["datasets"], versions)]
+    return derived["build"](*frames)
+
+@st.cache_data(max_entries=8)
+def load_derived(type, versions):
+    """Build a derived dataset, memoized per version of its source datasets"""
+    return build_derived(type, versions)
+
+@st.cache_resource(max_entries=2)
+def load_derived_resource(type, versions):
+    """Same as load_derived for objects shared between sessions instead of copied"""
+    return build_derived(type, versions)
+
+class PageData:
+    """Datasets of the current rerun, materialized on first access"""
+
+    def __init__(self):
+        self.frames = {}
+
+    def __getitem__(self, type):
+        if type not in self.frames:
+            if type in DERIVED_DATASETS:
+                versions = tuple(get_data_version(name) for name in DERIVED_DATASETS[type]["datasets"])
+                if DERIVED_DATASETS[type].get("resource"):
+                    self.frames[type] = load_derived_resource(type, versions)
+                else:
+                    self.frames[type] = load_derived(type, versions)
+            else:
+                self.frames[type] = get_dataframe(type, get_data_version(type))
+        return self.frames[type]
+
+# Pages that can be served from the pre-rendered snapshots of snapshot.py
+STATIC_PAGES = {
+    "main": {"view": "main", "details_page": "details_managers", "proportion": [6, 2, 5]},
+    "page_adepts": {"view": "adepts", "details_page": "details_adepts", "proportion": [5.6, 2, 5]},
+}
+
+@st.cache_data(max_entries=4)
+def read_static_snapshot(view, mtime):
+    return read_snapshot(view)
+
+def get_static_snapshot(page):
+    """Snapshot of a page when static snapshot mode is enabled"""
+    if page not in STATIC_PAGES or not settings.get_bool("static_snapshots"):
+        return None
+    view = STATIC_PAGES[page]["view"]
+    path = snapshot_path(view)
+    if not os.path.exists(path):
+        return None
+    return read_static_snapshot(view, os.path.getmtime(path))
+
+TABLE_PAGE_SIZE = 25
+
+def format_money(value):
+    return '{:,.2f}€'.format(value)
+
+def display_dataframe(df, height="auto", type="default", page_size=None, formatters=None, key="table"):
+    """Show a table, or with page_size only one sorted and filtered page of it.
+
+    In paginated mode df is the unformatted aggregate: filtering and sorting run
+    on its raw values and formatters are applied to the visible rows only.
+    """
     porpotion = [5.5, 10, 5]
     if type == "adepts":
         porpotion = [7, 9, 5]
@@ -49,6 +202,9 @@ def display_dataframe(df, height="auto", type="default"):
         porpotion = [7.5, 9, 5]
     col1, centerTable, col3 = st.columns(porpotion)
     with centerTable:
+        if page_size:
+            df = paginate_dataframe(centerTable, df, page_size, formatters or {}, key)
+            height = (len(df) * 35) + 40
         centerTable.dataframe(df,
             column_config={
                 "club_group": "Clube",
@@ -57,9 +213,33 @@ def display_dataframe(df, height="auto", type="default"):
             },
         hide_index=True,
         height=height)
+
+def paginate_dataframe(container, df, page_size, formatters, key):
+    search, sort, order = container.columns([4, 4, 2])
+    query = search.text_input("Pesquisar clube", key=key + "_search")
+    sort_column = sort.selectbox("Ordenar por", options=[column for column in df.columns if column != "club_group"], key=key + "_sort")
+    ascending = order.selectbox("Ordem", options=["Desc", "Asc"], key=key + "_order") == "Asc"
+
+    if query:
+        df = df[df['club_group'].astype(str).str.contains(query, case=False, regex=False)]
+    # The club name breaks ties so pages stay stable between reruns
+    df = df.sort_values([sort_column, 'club_group'], ascending=[ascending, True])
+
+    pages = max(1, -(-len(df) // page_size))
+    if st.session_state.get(key + "_page", 1) > pages:
+        st.session_state[key + "_page"] = pages
+    page = container.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=key + "_page")
+
+    page_df = df.iloc[(page - 1) * page_size:page * page_size].copy()
+    for column, formatter in formatters.items():
+        if column in page_df:
+            page_df[column] = page_df[column].map(formatter)
+    return page_df
     
 # Function to load and process data
 def load_data(file_path):
+    import pandas as pd
+
     with open(file_path, 'r') as file:
         data = json.load(file)
     df = pd.DataFrame(data)
@@ -67,36 +247,13 @@ def load_data(file_path):
     return df
 
 
-# Function to get clubs by sanctions count
-def get_clubs_data(df, limit=None, type="default"):
-    if df.empty:
-        return df
-    
-    aggregation = {
-        'quantity': 'sum',
-        'fines': 'sum',
-        'suspension_days': 'sum'
-    }
-
-    columns = {
-        'quantity': 'Total Castigos',
-        'fines': 'Total Multas',
-        'suspension_days': 'Total Dias de Suspensão'
-    }
-   
-    if type != "default":
-        del aggregation['suspension_days']
-        del columns['suspension_days']
+def display_summary_statistics(df, type="default"):
+    from analytics import get_summary
 
-    data = (df.groupby('club_group').agg(aggregation).sort_values('quantity', ascending=False).reset_index().rename(
-        columns=columns
-    ))
-    if limit:
-        return data.head(limit)
-    return data
+    display_summary_metrics(get_summary(df, type), type)
 
 
-def display_summary_statistics(df, type="default"):
+def display_summary_metrics(summary, type="default"):
     #st.subheader("Estatíticas")
     porpotion = [1, 6, 7, 2, 1]
     if type == "adepts":
@@ -104,109 +261,17 @@ def display_summary_statistics(df, type="default"):
     col1, col2, col3, col4, col5 = st.columns(porpotion)
 
     with col2:
-        if 'quantity' in df: 
-            total_sanctions = df['quantity'].sum()
-            st.metric("Total Castigos", f"{total_sanctions:,}")
-        else:
-            st.metric("Total Castigos", f"{0:,}")
+        st.metric("Total Castigos", f"{summary['total_sanctions']:,}")
 
     with col3:
-        if 'fines' in df:
-            total_fines = df['fines'].sum()
-            st.metric("Total Multas", f"{total_fines:,.2f}€")
-        else:
-            st.metric("Total Multas", f"{0:,.2f}€")
+        st.metric("Total Multas", f"{summary['total_fines']:,.2f}€")
     
     with col4:
         if type == "default":
-            if 'suspension_days' in df:
-                total_suspension_days = df['suspension_days'].sum()
-                st.metric("Total Dias de Suspensão", f"{total_suspension_days:,}")
-            else:
-                st.metric("Total Dias de Suspensão", f"{0:,}")
+            st.metric("Total Dias de Suspensão", f"{summary['total_suspension_days']:,}")
         if type == "adepts":
-            if 'club_group' in df:
-                total_clubs = len(df['club_group'].unique())
-                st.metric("Total de Clubes Castigados", f"{total_clubs}")
-            else:
-                st.metric("Total de Clubes Castigados", f"{0}")
-
-
-def create_cumulative_sanctions_chart(df, top_10_clubs):
-    # Filter for top 10 clubs
-    filtered_df = df[df['club_group'].isin(top_10_clubs['club_group'])]
-
-    # Create daily sanctions per club
-    daily_sanctions = (filtered_df.groupby(
-        ['date', 'club_group', 'quantity']).size().reset_index(name='count'))
-
-    # Calculate cumulative sanctions for each club
-    daily_sanctions = daily_sanctions.sort_values('date')
-    cumulative_sanctions = []
+            st.metric("Total de Clubes Castigados", f"{summary['total_clubs']}")
 
-    for club in top_10_clubs['club_group']:
-        club_data = daily_sanctions[daily_sanctions['club_group'] == club].copy()
-
-        club_data['cumulative_count'] = club_data['quantity'].cumsum()
-        cumulative_sanctions.append(club_data)
-
-    cumulative_df = pd.concat(cumulative_sanctions)
-
-    # Calculate total cumulative sanctions
-    total_daily = (daily_sanctions.groupby('date')['quantity'].sum().reset_index())
-    total_daily['cumulative_count'] = total_daily['quantity'].cumsum()
-
-    fig = px.line(cumulative_df,
-        x='date',
-        y='cumulative_count',
-        color='club_group',
-        title='Castigos Acumulados por Clube',
-        labels={
-            'cumulative_count': 'Castigos',
-            'date': 'Data',
-            'club_group': 'Clube'
-        }
-    )
-    
-    # Add markers to show points explicitly
-    fig.update_traces(mode='lines+markers')
-    
-    # Update x-axis format to show only date
-    fig.update_layout(
-        xaxis_title="Data",
-        yaxis_title="Número de Castigos Acumulados",
-        height=400,
-        xaxis=dict(
-            tickformat="%d %B %Y",
-            tickformatstops=[
-                dict(dtickrange=[None, None], value="%d %B %Y")
-            ]
-        ),
-        legend=dict(
-            orientation="h",    # horizontal orientation
-            yanchor="top",
-            y=-0.2,            # position below the graph
-            xanchor="center",
-            x=0.5
-        )
-    )
-
-    #fig.add_trace(
-    #    go.Scatter(x=total_daily['date'],
-    #               y=total_daily['cumulative_count'],
-    #               name='Total Todos Clubes',
-    #               line=dict(color='black', width=3, dash='dash'),
-    #               mode='lines'))
-
-    fig.update_layout(showlegend=True,
-                      #legend=dict(yanchor="top",
-                     #             y=0.99,
-                     #             xanchor="left",
-                     #             x=1.05),
-                      height=600,
-                      yaxis_title="Número de Castigos Acumulados por Clube")
-
-    return fig
 
 def club_selector(df):
     """Creates a select box with unique club names and handles navigation"""
@@ -230,7 +295,7 @@ def club_selector(df):
             st.session_state.selected_club = selected_club
             st.rerun()
 
-def main_page(df):
+def main_page(df, clubs_df, fig):
     st.markdown(
         """
         <style>
@@ -254,7 +319,7 @@ def main_page(df):
     # Summary Statistics
 
     #st.subheader("Castigos Dirigentes/Treinadores")
-    top_10_df = get_clubs_data(df, limit=10)
+    top_10_df = clubs_df.head(10)
 
     if df.empty: 
         st.write("Sem dados no momento")
@@ -280,11 +345,52 @@ def main_page(df):
 
         # Cumulative Sanctions Graph
         st.subheader("Castigos ao longo do Tempo")
-        fig = create_cumulative_sanctions_chart(df, top_10_df)
         st.plotly_chart(fig, use_container_width=True)
 
 
-def details_managers_sanctions_page(df):
+def static_page(snapshot):
+    """Render a public view from its snapshot, without loading any dataset"""
+    import pandas as pd
+
+    options = STATIC_PAGES[st.session_state.page]
+    type = SNAPSHOT_VIEWS[snapshot["view"]]["type"]
+    st.markdown(
+        """
+        <style>
+        .centered-title {
+            text-align: center;
+            font-size: 30px;
+            font-weight: bold;
+        }
+        </style>
+        <h1 class="centered-title">AF Porto Análise de Castigos</h1>
+        """,
+        unsafe_allow_html=True
+    )
+    display_menu()
+
+    if not snapshot["table"]:
+        st.write("Sem dados no momento")
+        return
+
+    display_summary_metrics(snapshot["summary"], type)
+    club_selector(pd.DataFrame({'club_group': snapshot["clubs"]}))
+
+    formatted_df = pd.DataFrame(snapshot["table"])
+    formatted_df['Total Multas'] = formatted_df['Total Multas'].map('{:,.2f}€'.format)
+    table_height = (len(formatted_df) * 35) + 40
+    display_dataframe(formatted_df, height=table_height, type="adepts" if type == "adepts" else "default")
+
+    col1, centerButton, col3 = st.columns(options["proportion"])
+    with centerButton: 
+        if centerButton.button("Ver Mais"):
+            st.session_state.page = options["details_page"]
+            st.rerun()
+
+    st.subheader("Castigos ao longo do Tempo")
+    st.plotly_chart(snapshot["figure"], use_container_width=True)
+
+def details_managers_sanctions_page(df, full_df):
     st.markdown(
         """
         <style>
@@ -304,16 +410,6 @@ def details_managers_sanctions_page(df):
     #st.subheader("Tabela Completa de Castigos Dirigentes/Treinadores")
     # Summary Statistics
     display_summary_statistics(df)
-    # Full table
-    full_df = get_clubs_data(df)
-
-    # Format the numeric columns
-    formatted_df = full_df.copy()
-    formatted_df['Total Multas'] = formatted_df['Total Multas'].map('{:,.2f}€'.format)
-
-    # Calculate required height based on number of rows
-    table_height = (len(formatted_df) * 35) + 40
-
     # Centered "Back" button
     col1, col2, col3, col4, col5 = st.columns([1, 6, 7, 2, 1])
     with col2: 
@@ -321,37 +417,40 @@ def details_managers_sanctions_page(df):
             st.session_state.page = "main"
             st.rerun()
 
-    club_selector(df)
-    display_dataframe(formatted_df, height=table_height)
+    club_selector(full_df)
+    # Full table, one page at a time
+    display_dataframe(full_df, page_size=TABLE_PAGE_SIZE, formatters={'Total Multas': format_money}, key="details_managers")
+
+# Views of the navigation menu and their page
+MENU_VIEWS = {
+    "Castigos Dirigentes/Treinadores": "main",
+    "Castigos Público": "page_adepts",
+    "Castigos por Escalão": "formations",
+}
 
 def display_menu():
     col1, center, col3 = st.columns(3)  # The middle column is larger to center content
     with center:
+        views = list(MENU_VIEWS)
         selection = st.selectbox(
             "Escolha uma opção",  # Label for the select box
-            options=["Castigos Dirigentes/Treinadores", "Castigos Público"],  # List of options
-            index=0 if st.session_state.current_view == "Castigos Dirigentes/Treinadores" else 1,
+            options=views,  # List of options
+            index=views.index(st.session_state.current_view) if st.session_state.current_view in MENU_VIEWS else 0,
             key="navigation"
         )
 
         # Action based on the selection
         if selection != st.session_state.current_view:
-            if selection == "Castigos Dirigentes/Treinadores":
-                st.session_state.page = "main"
-                st.session_state.current_view = "Castigos Dirigentes/Treinadores" 
-                st.rerun()
-
-            elif selection == "Castigos Público":
-                st.session_state.page = "page_adepts"
-                st.session_state.current_view = "Castigos Público"
-                st.rerun()
+            st.session_state.page = MENU_VIEWS[selection]
+            st.session_state.current_view = selection
+            st.rerun()
 
 def display_club_menu(club_name):
     col1, center, col3 = st.columns(3)  # The middle column is larger to center content
     with center:
         selection = st.selectbox(
             "Escolha uma opção",  # Label for the select box
-            options=["", "Estatisticas", "Contactos"],  # List of options
+            options=["", "Estatisticas", "Comparação", "Contactos"],  # List of options
             key="key"
         )
         # Action based on the selection
@@ -362,6 +461,12 @@ def display_club_menu(club_name):
                 st.session_state.selected_club = club_name
                 st.rerun()
 
+            elif selection == "Comparação":
+                st.session_state.page = "club_comparison"
+                st.session_state.current_view = "Comparação"
+                st.session_state.selected_club = club_name
+                st.rerun()
+
             elif selection == "Contactos":
                 st.session_state.page = "club_contacts"
                 st.session_state.current_view = "Contactos"
@@ -369,6 +474,9 @@ def display_club_menu(club_name):
                 st.rerun()
 
 def club_contacts_page(df_clubs, df_name):
+    import pandas as pd
+    from club_images import get_thumbnail
+
     club_info = df_clubs[df_clubs['alias'].astype(str).str.strip() == str(df_name).strip()]
     display_club_menu(df_name)
     st.markdown(f"""
@@ -386,28 +494,32 @@ def club_contacts_page(df_clubs, df_name):
         if not club_info.empty:
             labels, image = info.columns(2)
             with image:
-                image.image(club_info["img_url"].iloc[0], width=200)
+                image.image(get_thumbnail(club_info["img_url"].iloc[0], download=False) or club_info["img_url"].iloc[0], width=200)
             with labels:
                 labels.subheader("Clube")
-                labels.markdown(f"**{club_info["name"].iloc[0]}**")
+                labels.markdown(f"**{club_info['name'].iloc[0]}**")
                 labels.subheader("Cidade")
-                labels.markdown(f"**{club_info["city"].iloc[0]}**")
+                labels.markdown(f"**{club_info['city'].iloc[0]}**")
                 labels.subheader("AF Porto Website")
                 labels.page_link(page=club_info["url"].iloc[0], label=club_info["url"].iloc[0])
         else:
             st.write("Sem dados de contacto.")
         #info.dataframe(club_info)
     with map:
-        if "latitude" in club_info and "longitude" in club_info: 
+        has_coordinates = "latitude" in df_clubs and "longitude" in df_clubs
+        if has_coordinates and map.checkbox("Mostrar todos os clubes", key="all_clubs_map"):
+            gps_data = df_clubs[['latitude', 'longitude']].dropna()
+            map.map(data=gps_data, zoom=9)
+        elif has_coordinates and not club_info.empty and pd.notna(club_info["latitude"].iloc[0]):
             gps_data = pd.DataFrame({
                 'latitude': [club_info["latitude"].iloc[0]],
                 'longitude': [club_info["longitude"].iloc[0]]
             })
             map.map(data=gps_data, zoom=14)
         else:
-            map.map(data=data_gps, zoom=15)
+            map.map(data=pd.DataFrame(data_gps), zoom=15)
 
-def adepts_sanctions_page(df):
+def adepts_sanctions_page(df, clubs_df, fig):
     st.markdown(
         """
         <style>
@@ -429,7 +541,7 @@ def adepts_sanctions_page(df):
     # Summary Statistics
 
     # Top 10 Clubs Table
-    top_10_df = get_clubs_data(df, limit=10, type="adepts")
+    top_10_df = clubs_df.head(10)
 
 
     if df.empty: 
@@ -453,10 +565,9 @@ def adepts_sanctions_page(df):
 
         # Cumulative Sanctions Graph
         st.subheader("Castigos ao longo do Tempo")
-        fig = create_cumulative_sanctions_chart(df, top_10_df)
         st.plotly_chart(fig, use_container_width=True)
 
-def details_adepts_sanctions_page(df):
+def details_adepts_sanctions_page(df, full_df):
     st.markdown(
         """
         <style>
@@ -474,30 +585,85 @@ def details_adepts_sanctions_page(df):
 
     # Summary Statistics
     display_summary_statistics(df, "adepts")
-    # Full table
-    full_df = get_clubs_data(df, type="clubs")
-
-    # Format the numeric columns
-    formatted_df = full_df.copy()
-    formatted_df['Total Multas'] = formatted_df['Total Multas'].map(
-        '{:,.2f}€'.format)
-
-    # Calculate required height based on number of rows
-    table_height = (len(formatted_df) * 35) + 40
-
     col1, col2, col3, col4, col5 = st.columns([1, 6, 7, 2, 1])
     with col2: 
         if col2.button("Voltar"):
             st.session_state.page = "page_adepts"
             st.rerun()
 
-    club_selector(df)
-    display_dataframe(formatted_df, height=table_height, type="details_adepts")
+    club_selector(full_df)
+    # Full table, one page at a time
+    display_dataframe(full_df, type="details_adepts", page_size=TABLE_PAGE_SIZE, formatters={'Total Multas': format_money}, key="details_adepts")
+
+def create_club_timeline_chart(timeline, title):
+    import pandas as pd
+    import plotly.express as px
+    from analytics import downsample, render_mode, line_mode
+
+    # If there's only one entry, duplicate it to show a point
+    if len(timeline) == 1:
+        single_date = timeline.iloc[0]['date']
+        single_quantity = timeline.iloc[0]['quantity']
+        # Create a second point 1 day later with the same cumulative value
+        timeline = pd.DataFrame({
+            'date': [single_date+pd.Timedelta(days=-1), single_date, single_date+pd.Timedelta(days=1)],
+            'quantity': [0, single_quantity, 0]
+        })
+        timeline['cumulative_quantity'] = timeline['quantity'].cumsum()
+
+    # Long timelines keep a bounded number of their real points
+    timeline = downsample(timeline, 'date', 'cumulative_quantity')
+    fig = px.line(timeline, 
+                  x='date', 
+                  y='cumulative_quantity',
+                  render_mode=render_mode(len(timeline)),
+                  title=title)
+    
+    # Add markers to show points explicitly
+    fig.update_traces(mode=line_mode(len(timeline)))
+    
+    # Update x-axis format to show only date
+    fig.update_layout(
+        xaxis_title="Data",
+        yaxis_title="Número de Castigos Acumulados",
+        height=400,
+        xaxis=dict(
+            tickformat="%d %B %Y",
+            tickformatstops=[
+                dict(dtickrange=[None, None], value="%d %B %Y")
+            ]
+        ),
+        legend=dict(
+            orientation="h",    # horizontal orientation
+            yanchor="top",
+            y=-0.2,            # position below the graph
+            xanchor="center",
+            x=0.5
+        )
+    )
+    
+    # Format hover text to include daily quantity
+    fig.update_traces(
+        hovertemplate="Data: %{x|%d %B %Y}<br>Total Acumulado: %{y}<br>Castigos no Dia: %{text}<extra></extra>",
+        text=timeline['quantity']
+    )
+    return fig
 
-    # Centered "Back" button
+def display_club_ranking(totals, clubs_count):
+    """Position of a club among all the clubs of a sanctions table"""
+    col1, col2, col3, col4, col5 = st.columns([1, 6, 7, 2, 1])
+    with col2:
+        st.metric("Posição (Castigos)", f"{int(totals['rank_quantity'])}º de {clubs_count}")
+    with col3:
+        st.metric("Percentil (Castigos)", f"{totals['percentile_quantity'] * 100:.0f}%")
+    with col4:
+        st.metric("Castigos Últimos 30 Dias", f"{int(totals['recent_quantity']):,}")
 
 # Add this new function for the club details page
-def display_club_graphs(df_managers, df_adepts, club_name):
+def display_club_graphs(stats, cube, club_name):
+    from club_stats import get_club_timeline, get_club_totals
+    from sanctions_cube import rollup
+
     display_club_menu(club_name)
     st.markdown(f"""
         <h1 class="centered-title">Evolução dos Castigos: {club_name}</h1>
@@ -510,125 +676,185 @@ def display_club_graphs(df_managers, df_adepts, club_name):
             st.session_state.page = st.session_state.previous_page
             st.rerun()
     
-    # Filter data for this club
-    
-    # Create timeline graphs
-    st.subheader("Castigos Dirigentes/Treinadores")
-    if not df_managers.empty:  # Changed from not empty to length check
-        club_managers = df_managers[df_managers['club_group'].astype(str).str.strip() == str(club_name).strip()]
-        display_summary_statistics(club_managers)
-        timeline_managers = club_managers.groupby('date')['quantity'].sum().reset_index()
-        timeline_managers = timeline_managers.sort_values('date')
-        print(timeline_managers)
-        
-        # If there's only one entry, duplicate it to show a point
-        if len(timeline_managers) == 1:
-            single_date = timeline_managers.iloc[0]['date']
-            single_quantity = timeline_managers.iloc[0]['quantity']
-            # Create a second point 1 day later with the same cumulative value
-            new_row = pd.DataFrame({
-                'date': [single_date+pd.Timedelta(days=-1), single_date, single_date+pd.Timedelta(days=1)],
-                'quantity': [0, single_quantity, 0]
-            })
-            timeline_managers = pd.concat([new_row], ignore_index=True)
-        
-        timeline_managers['cumulative_sanctions'] = timeline_managers['quantity'].cumsum()
-        
-        fig_managers = px.line(timeline_managers, 
-                             x='date', 
-                             y='cumulative_sanctions',
-                             title=f'Evolução dos Castigos Dirigentes/Treinadores - {club_name}')
-        
-        # Add markers to show points explicitly
-        fig_managers.update_traces(mode='lines+markers')
-        
-        # Update x-axis format to show only date
-        fig_managers.update_layout(
-            xaxis_title="Data",
-            yaxis_title="Número de Castigos Acumulados",
-            height=400,
-            xaxis=dict(
-                tickformat="%d %B %Y",
-                tickformatstops=[
-                    dict(dtickrange=[None, None], value="%d %B %Y")
-                ]
-            ),
-             legend=dict(
-                orientation="h",    # horizontal orientation
-                yanchor="top",
-                y=-0.2,            # position below the graph
-                xanchor="center",
-                x=0.5
-            )
-        )
-        
-        # Format hover text to include daily quantity
-        fig_managers.update_traces(
-            hovertemplate="Data: %{x|%d %B %Y}<br>Total Acumulado: %{y}<br>Castigos no Dia: %{text}<extra></extra>",
-            text=timeline_managers['quantity']
-        )
-        
-        st.plotly_chart(fig_managers, use_container_width=True)
-    else:
-        st.write("Sem dados de castigos para dirigentes/treinadores")
-    
-    st.subheader("Castigos Público")
-    if not df_adepts.empty:  # Changed from not empty to length check
-        club_adepts = df_adepts[df_adepts['club_group'].astype(str).str.strip() == str(club_name).strip()]
-        display_summary_statistics(club_adepts, type="club")
-        timeline_adepts = club_adepts.groupby('date')['quantity'].sum().reset_index()
-        timeline_adepts = timeline_adepts.sort_values('date')
-        
-        # If there's only one entry, duplicate it to show a point
-        if len(timeline_adepts) == 1:
-            single_date = timeline_adepts.iloc[0]['date']
-            single_quantity = timeline_adepts.iloc[0]['quantity']
-            # Create a second point 1 day later with the same cumulative value
-            new_row = pd.DataFrame({
-                'date': [single_date+pd.Timedelta(days=-1), single_date, single_date+pd.Timedelta(days=1)],
-                'quantity': [0, single_quantity, 0]
+    clubs_count = stats["totals"].groupby(level='source').size()
+    sections = [
+        ("managers", "Castigos Dirigentes/Treinadores", "default"),
+        ("adepts", "Castigos Público", "club"),
+    ]
+    for source, title, type in sections:
+        st.subheader(title)
+        totals = get_club_totals(stats, source, club_name)
+        if totals is None:
+            if source == "managers":
+                st.write("Sem dados de castigos para dirigentes/treinadores")
+            else:
+                st.write("Sem dados de castigos para público")
+            continue
+
+        display_summary_metrics({
+            "total_sanctions": int(totals['quantity']),
+            "total_fines": float(totals['fines']),
+            "total_suspension_days": int(totals['suspension_days']),
+        }, type)
+        display_club_ranking(totals, int(clubs_count[source]))
+
+        timeline = get_club_timeline(stats, source, club_name)
+        fig = create_club_timeline_chart(timeline, f'Evolução dos {title} - {club_name}')
+        st.plotly_chart(fig, use_container_width=True)
+
+        by_formation = rollup(cube, ['month', 'formation'], source=source, club_group=str(club_name).strip())
+        if not by_formation.empty:
+            by_formation = by_formation[['formation', 'month', 'quantity', 'fines']]
+            by_formation = by_formation.rename(columns={
+                'formation': 'Escalão',
+                'month': 'Mês',
+                'quantity': 'Total Castigos',
+                'fines': 'Total Multas',
             })
-            timeline_adepts = pd.concat([new_row], ignore_index=True)
-        
-        timeline_adepts['cumulative_sanctions'] = timeline_adepts['quantity'].cumsum()
-        
-        fig_adepts = px.line(timeline_adepts, 
-                            x='date', 
-                            y='cumulative_sanctions',
-                            title=f'Evolução dos Castigos Público - {club_name}')
-        
-        # Add markers to show points explicitly
-        fig_adepts.update_traces(mode='lines+markers')
-        
-        # Update x-axis format to show only date
-        fig_adepts.update_layout(
-            xaxis_title="Data",
-            yaxis_title="Número de Castigos Acumulados",
-            height=400,
-            xaxis=dict(
-                tickformat="%d %B %Y",
-                tickformatstops=[
-                    dict(dtickrange=[None, None], value="%d %B %Y")
-                ]
-            ),
-            legend=dict(
-                orientation="h",    # horizontal orientation
-                yanchor="top",
-                y=-0.2,            # position below the graph
-                xanchor="center",
-                x=0.5
-            )
+            by_formation['Total Multas'] = by_formation['Total Multas'].map('{:,.2f}€'.format)
+            with st.expander("Castigos por Escalão e Mês"):
+                st.dataframe(by_formation, hide_index=True)
+
+def club_comparison_page(stats, club_name):
+    display_club_menu(club_name)
+    st.markdown("""<h1 class="centered-title">Comparação entre Clubes</h1>""", unsafe_allow_html=True)
+
+    col1, col2, col3, col4, col5 = st.columns([1, 6, 7, 2, 1])
+    with col1:
+        if st.button("Voltar"):
+            st.session_state.page = st.session_state.previous_page
+            st.rerun()
+
+    sources = {"Castigos Dirigentes/Treinadores": "managers", "Castigos Público": "adepts"}
+    col1, center, col3 = st.columns(3)
+    with center:
+        source = sources[st.selectbox("Tabela", options=list(sources), key="comparison_source")]
+
+    totals = stats["totals"]
+    if source not in totals.index.get_level_values('source'):
+        st.write("Sem dados no momento")
+        return
+
+    ranking = totals.loc[source].sort_values('rank_quantity').reset_index()
+    default_clubs = [club for club in [str(club_name).strip()] if club in set(ranking['club_group'])]
+    with center:
+        clubs = st.multiselect("Clubes", options=list(ranking['club_group']),
+            default=default_clubs or list(ranking['club_group'].head(3)), key="comparison_clubs")
+
+    if clubs:
+        import plotly.express as px
+        from analytics import downsample_groups, render_mode
+        from club_stats import get_matrix
+
+        matrix = get_matrix(stats, source, 'quantity', cumulative=True)[clubs]
+        series = matrix.reset_index().melt(id_vars='date', var_name='club_group', value_name='cumulative_count')
+        series = downsample_groups(series, 'club_group', 'date', 'cumulative_count')
+        fig = px.line(series,
+            x='date',
+            y='cumulative_count',
+            color='club_group',
+            render_mode=render_mode(len(series)),
+            title='Castigos Acumulados por Clube',
+            labels={
+                'cumulative_count': 'Castigos',
+                'date': 'Data',
+                'club_group': 'Clube'
+            }
         )
-        
-        # Format hover text to include daily quantity
-        fig_adepts.update_traces(
-            hovertemplate="Data: %{x|%d %B %Y}<br>Total Acumulado: %{y}<br>Castigos no Dia: %{text}<extra></extra>",
-            text=timeline_adepts['quantity']
+        fig.update_layout(xaxis_title="Data", yaxis_title="Número de Castigos Acumulados", height=500)
+        st.plotly_chart(fig, use_container_width=True)
+
+    columns = {
+        'rank_quantity': 'Posição',
+        'club_group': 'Clube',
+        'quantity': 'Total Castigos',
+        'fines': 'Total Multas',
+        'percentile_quantity': 'Percentil',
+        'recent_quantity': f'Castigos Últimos {stats["window"]} Dias',
+    }
+    if source == "managers":
+        columns['suspension_days'] = 'Total Dias de Suspensão'
+    formatted_df = ranking[list(columns)].rename(columns=columns)
+    formatted_df['Total Multas'] = formatted_df['Total Multas'].map('{:,.2f}€'.format)
+    formatted_df['Percentil'] = formatted_df['Percentil'].map('{:.0%}'.format)
+    col1, centerTable, col3 = st.columns([2, 10, 2])
+    with centerTable:
+        centerTable.dataframe(formatted_df, hide_index=True)
+
+FORMATION_MEASURES = {
+    'quantity': 'Total Castigos',
+    'fines': 'Total Multas',
+    'suspension_days': 'Total Dias de Suspensão',
+}
+
+def formations_page(cube):
+    """Sanctions by formation and period, drilled down from seasons to months"""
+    from sanctions_cube import rollup, pivot
+
+    st.markdown("""<h1 class="centered-title">Castigos por Escalão</h1>""", unsafe_allow_html=True)
+    display_menu()
+
+    if cube["cells"].empty:
+        st.write("Sem dados no momento")
+        return
+
+    sources = {"Castigos Dirigentes/Treinadores": "managers", "Castigos Público": "adepts"}
+    col1, col2, col3, col4, col5 = st.columns([1, 4, 4, 4, 1])
+    with col2:
+        source = sources[st.selectbox("Tabela", options=list(sources), key="formations_source")]
+    with col3:
+        season = st.selectbox("Época", options=["Todas"] + cube["seasons"][::-1], key="formations_season")
+    with col4:
+        formation = st.selectbox("Escalão", options=["Todos"] + cube["formations"], key="formations_formation")
+    season = None if season == "Todas" else season
+    formation = None if formation == "Todos" else formation
+
+    measures = dict(FORMATION_MEASURES)
+    if source != "managers":
+        del measures['suspension_days']
+    totals = rollup(cube, [], source=source, season=season, formation=formation).iloc[0]
+    display_summary_metrics({
+        "total_sanctions": int(totals['quantity']),
+        "total_fines": float(totals['fines']),
+        "total_suspension_days": int(totals['suspension_days']),
+    }, "default" if source == "managers" else "club")
+
+    # All seasons side by side, or the months of the selected one
+    period = "month" if season else "season"
+    matrix = pivot(cube, 'formation', period, source=source, season=season, formation=formation)
+    if not matrix.empty:
+        import plotly.express as px
+
+        series = matrix.reset_index().melt(id_vars='formation', var_name=period, value_name='quantity')
+        fig = px.bar(series,
+            x=period,
+            y='quantity',
+            color='formation',
+            title='Castigos por Escalão',
+            labels={'quantity': 'Castigos', 'season': 'Época', 'month': 'Mês', 'formation': 'Escalão'}
         )
-        
-        st.plotly_chart(fig_adepts, use_container_width=True)
-    else:
-        st.write("Sem dados de castigos para público")
+        fig.update_layout(xaxis_title="Mês" if season else "Época", yaxis_title="Número de Castigos", height=450)
+        st.plotly_chart(fig, use_container_width=True)
+
+    # Clubs of the slice, most sanctioned first
+    clubs = rollup(cube, ['club_group'], source=source, season=season, formation=formation)
+    clubs = clubs.sort_values(['quantity', 'club_group'], ascending=[False, True])[['club_group'] + list(measures)]
+    clubs = clubs.rename(columns=measures)
+    clubs['Total Multas'] = clubs['Total Multas'].map(format_money)
+    st.subheader("Clubes")
+    display_dataframe(clubs, height=(min(len(clubs), 10) * 35) + 40)
+
+# Every page with the datasets it needs, in the order its render function takes them
+PAGES = {
+    "main": {"render": main_page, "datasets": ["managers_sanctions", "managers_clubs", "managers_chart"], "club": False},
+    "details_managers": {"render": details_managers_sanctions_page, "datasets": ["managers_sanctions", "managers_clubs"], "club": False},
+    "page_adepts": {"render": adepts_sanctions_page, "datasets": ["adepts_sanctions", "adepts_clubs", "adepts_chart"], "club": False},
+    "details_adepts": {"render": details_adepts_sanctions_page, "datasets": ["adepts_sanctions", "adepts_clubs"], "club": False},
+    "formations": {"render": formations_page, "datasets": ["sanctions_cube"], "club": False},
+    "club_details": {"render": display_club_graphs, "datasets": ["club_stats", "sanctions_cube"], "club": True},
+    "club_comparison": {"render": club_comparison_page, "datasets": ["club_stats"], "club": True},
+    "club_contacts": {"render": club_contacts_page, "datasets": ["clubs_info"], "club": True},
+}
 
 # Update the main() function to include the new club_details page
 def main():
@@ -639,47 +865,21 @@ def main():
     if 'previous_page' not in st.session_state:
         st.session_state.previous_page = "main"
     
-    # Load data (your existing data loading code remains the same)
-    sanctions_managers = fetch_data_from_api("managers_sanctions")
-    df_sanctions_managers = pd.DataFrame()
-    if sanctions_managers['success'] == True:
-        df_sanctions_managers = pd.DataFrame(sanctions_managers['response'])
-    else:
-        df_sanctions_managers = pd.read_json("sanctions_managers_db.json")
-    
-    if 'date' in df_sanctions_managers:
-        df_sanctions_managers['date'] = pd.to_datetime(df_sanctions_managers['date'])
-    
-    sanctions_adepts = fetch_data_from_api("adepts_sanctions")
-    df_sanctions_adepts = pd.DataFrame()
-    if sanctions_managers['success'] == True:
-        df_sanctions_adepts = pd.DataFrame(sanctions_adepts['response'])
-    else:
-        df_sanctions_adepts = pd.read_json("sanctions_adepts_db.json")
-    
-    if 'date' in df_sanctions_adepts:
-        df_sanctions_adepts['date'] = pd.to_datetime(df_sanctions_adepts['date'])
-
-    clubs_info = fetch_data_from_api("clubs_info")
-    df_clubs_info = pd.DataFrame()
-    if clubs_info['success'] == True:
-        df_clubs_info = pd.DataFrame(clubs_info['response'])
-    else:
-        df_clubs_info = []
-    
+    # Public views are served from their snapshot when one is available
+    snapshot = get_static_snapshot(st.session_state.page)
+    if snapshot is not None:
+        static_page(snapshot)
+        return
+
+    # Only the datasets the current page declares are loaded
+    page = PAGES.get(st.session_state.page, PAGES["main"])
+    data = PageData()
+    frames = [data[type] for type in page["datasets"]]
+    if page["club"]:
+        frames.append(st.session_state.selected_club)
+
     # Display appropriate page
-    if st.session_state.page == "club_details":
-        display_club_graphs(df_sanctions_managers, df_sanctions_adepts, st.session_state.selected_club)
-    elif st.session_state.page == "main":
-        main_page(df_sanctions_managers)
-    elif st.session_state.page == "details_managers":
-        details_managers_sanctions_page(df_sanctions_managers)
-    elif st.session_state.page == "page_adepts":
-        adepts_sanctions_page(df_sanctions_adepts)
-    elif st.session_state.page == "details_adepts":
-        details_adepts_sanctions_page(df_sanctions_adepts)
-    elif st.session_state.page == "club_contacts":
-        club_contacts_page(df_clubs_info, st.session_state.selected_club)
+    page["render"](*frames)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,32 @@
+import sys
+import time
+import database.datasets
+import database.shared_data
+from config import settings
+
+def refresh_shared_data(directory, types=None):
+    """Fetch the datasets once (all by default) and publish the ones that changed"""
+    for type in types or database.datasets.DATASETS:
+        response = database.datasets.fetch_dataset(type)
+        if response.get('success') != True:
+            print(type + "...fetch failed, keeping the current version")
+            continue
+
+        version = response["version"]
+        if version == database.shared_data.current_version(type, directory):
+            print(type + "...unchanged")
+            continue
+
+        df = database.datasets.build_dataframe(type, response)
+        database.shared_data.publish(type, df, version, directory)
+        print(type + "..." + version)
+
+if __name__ == "__main__":
+    directory = settings.get("shared_data_dir", database.shared_data.SHARED_DATA_DIR)
+    if len(sys.argv) > 1 and sys.argv[1] == "once":
+        refresh_shared_data(directory)
+    else:
+        interval = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+        while True:
+            refresh_shared_data(directory)
+            time.sleep(interval)
@@ -0,0 +1,89 @@
+import re
+import pandas as pd
+from club_stats import MEASURES, combine_sanctions
+
+DIMENSIONS = ['source', 'club_group', 'formation', 'season', 'month']
+
+# Seasons run from July to June, like the competitions
+SEASON_START_MONTH = 7
+
+
+def season_name(year):
+    """Season starting in a year, as "2024/25" """
+    return f"{year}/{(year + 1) % 100:02d}"
+
+
+def formation_key(formation):
+    # S8, S9, ..., S19, then anything else (NA) at the end
+    match = re.fullmatch(r'S(\d+)', str(formation))
+    return (0, int(match.group(1)), "") if match else (1, 0, str(formation))
+
+
+def build_cube(df_managers, df_adepts):
+    """Materialized cube of both sanctions datasets over source, club, formation, season and month.
+
+    Returns a dict with:
+      cells      - one row per non-empty combination of DIMENSIONS, with the
+                   sum of each measure and the number of sanctions (count).
+                   Dimensions are categoricals, so slices compare codes
+      seasons    - the seasons of the data, oldest first
+      formations - the formations of the data, by age
+    Roll-ups and slices are computed from the cells, which are far fewer than
+    the sanction rows.
+    """
+    combined = combine_sanctions(df_managers, df_adepts, columns=['club_group', 'formation', 'date'])
+    dates = pd.to_datetime(combined['date'])
+    # Grouped as categoricals and month numbers, then named, which is much
+    # faster than grouping the strings
+    keys = {
+        'source': combined['source'].astype('category'),
+        'club_group': combined['club_group'].astype('category'),
+        'formation': combined['formation'].fillna("NA").astype(str).str.strip().astype('category'),
+        'season': dates.dt.year - (dates.dt.month < SEASON_START_MONTH),
+        'month': dates.dt.year * 12 + dates.dt.month - 1,
+    }
+    measures = combined[MEASURES].assign(count=1)
+    cells = measures.groupby([keys[dimension].rename(dimension) for dimension in DIMENSIONS], observed=True).sum().reset_index()
+
+    seasons = {year: season_name(year) for year in sorted(cells['season'].unique())}
+    months = {month: f"{month // 12}-{month % 12 + 1:02d}" for month in sorted(cells['month'].unique())}
+    formations = sorted(cells['formation'].astype(str).unique(), key=formation_key)
+    cells['formation'] = pd.Categorical(cells['formation'].astype(str), categories=formations, ordered=True)
+    cells['season'] = pd.Categorical(cells['season'].map(seasons), categories=list(seasons.values()), ordered=True)
+    cells['month'] = pd.Categorical(cells['month'].map(months), categories=list(months.values()), ordered=True)
+    return {"cells": cells, "seasons": list(seasons.values()), "formations": formations}
+
+
+def slice_cube(cube, **filters):
+    """Cells matching a value (or a list of values) of some dimensions, e.g. source="managers"."""
+    cells = cube["cells"]
+    mask = pd.Series(True, index=cells.index)
+    for dimension, value in filters.items():
+        if dimension not in DIMENSIONS:
+            raise ValueError("Unknown dimension " + dimension)
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            mask &= cells[dimension].isin(value)
+        else:
+            mask &= cells[dimension] == value
+    return cells[mask]
+
+
+def rollup(cube, by, **filters):
+    """Measures of a slice of the cube grouped by some dimensions.
+
+    by=[] gives the totals of the slice as a single row.
+    """
+    cells = slice_cube(cube, **filters)
+    by = list(by)
+    if not by:
+        return cells[MEASURES + ['count']].sum().to_frame().T
+    return (cells.groupby(by, observed=True)[MEASURES + ['count']].sum()
+        .reset_index())
+
+
+def pivot(cube, rows, columns, measure='quantity', **filters):
+    """Rows by columns matrix of a measure over a slice, 0 where there is nothing"""
+    cells = slice_cube(cube, **filters)
+    return cells.pivot_table(index=rows, columns=columns, values=measure, aggfunc='sum', observed=True, fill_value=0)
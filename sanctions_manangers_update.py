@@ -1,91 +1,63 @@
 from database.notion import get_results, update_page, create_page
-from config import parser_config
-import json
+from config import settings
+from jobs import run_job
+from database.invalidation import notify_changed
+from database.decoding import load_json, dump_json
 import uuid
-import time
-import datetime
 
-SANCTIONS_MANAGERS_DATABASE = parser_config('sanctions_managers_database_id')
-CLUBS_ALIAS_DATABASE = parser_config('clubs_alias_database_id')
 
 def get_sanctions():
-    results = get_results(SANCTIONS_MANAGERS_DATABASE)
+    results = get_results(settings['sanctions_managers_database_id'], schema="managers_sanctions")
     
-    rows = results["result"]
-    #print(rows)
+    sanctions = results["result"]
 
-    sanctions = []
-    for row in rows: 
-        page_id = row['id']
-        sanction_id = row["properties"]['SanctionId']["title"][0]['text']['content'] if len(row["properties"]['SanctionId']["title"]) > 0 else ""
-        club_group = row["properties"]['Club Group']["select"]['name']
-        quantity = row["properties"]['Quantity']["number"]
-        suspension_days = row["properties"]['Suspension Days']["number"]
-        formation = row["properties"]['Formation']["select"]['name']
-        fines = row["properties"]['Fines']["number"]
-        date = row["properties"]['Date']['date']["start"]
-        date = datetime.date.fromisoformat(date)
-        date = datetime.date.isoformat(date)
-        #print("----sanction----")
-        #print(sanction_id, date)
-        #print("----------------")
-        sanctions.append({
-            "page_id": page_id,
-            "sanction_id": sanction_id,
-            "club_group": club_group,
-            "quantity": quantity ,
-            "suspension_days": suspension_days ,
-            "formation": formation ,
-            "fines": fines ,
-            "date": date 
-        })
-
-    with open('sanctions_managers_db.json', 'w', encoding='utf8') as f:
-        json.dump(sanctions, f, ensure_ascii=False, indent=4)
+    dump_json(sanctions, 'sanctions_managers_db.json')
     
 
 def update_sanctions():
 
-    with open('sanctions_managers_db.json', 'r', encoding='utf8') as file:
-        sanctions_rows = json.load(file)
-
-    for sanction in sanctions_rows:
-        print("sanction...")
-        generated_uuid = uuid.uuid4().hex
-        print(sanction)
+    sanctions_rows = load_json('sanctions_managers_db.json')
 
-        if sanction["sanction_id"] != "":
-            continue
+    sanctions_rows = [sanction for sanction in sanctions_rows if sanction["sanction_id"] == ""]
 
+    def update_sanction(sanction):
+        generated_uuid = uuid.uuid4().hex
         data = {
             "SanctionId": {"title": [{"text": {"content": generated_uuid}}]}
         }
+        return update_page(data, sanction['page_id'])
 
-        print(data)
-        response = update_page(data, sanction['page_id'])
-        print(sanction["date"] + "..." + str(response['statusCode']))
-        if response['success'] == False:
-            print("Error...")
-            print(response)
-            break
-        time.sleep(1)
+    result = run_job("update_sanctions", sanctions_rows, lambda sanction: sanction['page_id'], update_sanction)
+    if result["done"] > 0:
+        notify_changed("managers_sanctions")
 
 
 def open_sanctions():
-    with open('sanctions_managers_db.json', 'r') as file:
-        sanctions_rows = json.load(file)
+    sanctions_rows = load_json('sanctions_managers_db.json')
 
     print(sanctions_rows[0])
 
 
+def open_sanctions_cube():
+    # pandas is only loaded by the scripts that query the cube
+    import pandas as pd
+    from sanctions_cube import build_cube, pivot
+
+    sanctions_rows = load_json('sanctions_managers_db.json')
+
+    cube = build_cube(pd.DataFrame(sanctions_rows), pd.DataFrame())
+    print(pivot(cube, 'month', 'formation', measure='fines', source="managers"))
+    return cube
+
+
 def get_clubs_alias():
-    results = get_results(SANCTIONS_MANAGERS_DATABASE)
+    results = get_results(settings['sanctions_managers_database_id'], schema="managers_sanctions")
 
-    rows = results["result"]["results"]
+    rows = results["result"]
 
     clubs = []
     for row in rows: 
-        club_group = row["properties"]['Club Group']["select"]['name']
+        club_group = row['club_group']
         
         if club_group not in clubs:    
             clubs.append(club_group)
@@ -95,27 +67,23 @@ def get_clubs_alias():
         for item in clubs:
             file.write(item + "\n")
 
-    with open('clubs_alias_db.json', 'w', encoding='utf8') as f:
-        json.dump(clubs, f, ensure_ascii=False, indent=4)
+    dump_json(clubs, 'clubs_alias_db.json')
 
 def create_clubs_alias(): 
 
     with open("clubs_alias_db.txt", "r") as file:
         clubs_rows = [line.strip() for line in file]
 
-    for club in clubs_rows:
+    def create_club_alias(club):
         data = {
             "Club": {"title": [{"text": {"content": club}}]},
             
         }
-        #print(data)
-        response = create_page(data, CLUBS_ALIAS_DATABASE)
-        print(club + "..." + str(response['statusCode']))
-        if response['success'] == False:
-            print("Error...")
-            #print(response)
-            break
-        time.sleep(1)
+        return create_page(data, settings['clubs_alias_database_id'])
+
+    result = run_job("create_clubs_alias", clubs_rows, lambda club: club, create_club_alias)
+    if result["done"] > 0:
+        notify_changed("clubs_info")
 
 def open_clubs():
     with open("clubs_alias_db.txt", "r") as file:
@@ -126,6 +94,7 @@ def open_clubs():
 get_sanctions()
 #update_sanctions()
 #open_sanctions()
+#open_sanctions_cube()
 #get_clubs_alias()
 #create_clubs_alias()
 #open_clubs()
\ No newline at end of file
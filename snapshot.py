@@ -0,0 +1,157 @@
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+SNAPSHOTS_DIR = "snapshots"
+
+# Public views that are the same for every visitor
+VIEWS = {
+    "main": {"dataset": "managers_sanctions", "type": "default", "title": "Castigos Dirigentes/Treinadores"},
+    "adepts": {"dataset": "adepts_sanctions", "type": "adepts", "title": "Castigos Público"},
+}
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="pt">
+<head>
+<meta charset="utf-8">
+<title>AF Porto Análise de Castigos - {title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1100px; }}
+h1, h3 {{ text-align: center; }}
+.metrics {{ display: flex; justify-content: space-around; margin: 2rem 0; }}
+.metric span {{ display: block; font-size: 2rem; }}
+table {{ margin: 0 auto; border-collapse: collapse; }}
+td, th {{ padding: 0.4rem 1rem; border-bottom: 1px solid #ddd; }}
+</style>
+</head>
+<body>
+<h1>AF Porto Análise de Castigos</h1>
+<h3>{title}</h3>
+<div class="metrics">{metrics}</div>
+{table}
+<h3>Castigos ao longo do Tempo</h3>
+{figure}
+<p><small>Atualizado em {generated_at}</small></p>
+</body>
+</html>
+"""
+
+METRIC_LABELS = {
+    "total_sanctions": ("Total Castigos", "{:,}"),
+    "total_fines": ("Total Multas", "{:,.2f}€"),
+    "total_suspension_days": ("Total Dias de Suspensão", "{:,}"),
+    "total_clubs": ("Total de Clubes Castigados", "{}"),
+}
+
+def snapshot_path(view, extension="json", output_dir=SNAPSHOTS_DIR):
+    return os.path.join(output_dir, view + "." + extension)
+
+def read_snapshot(view, output_dir=SNAPSHOTS_DIR):
+    path = snapshot_path(view, output_dir=output_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf8') as file:
+        return json.load(file)
+
+def write_file(path, content):
+    """Write a file atomically so readers never see a partial snapshot"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def render_view(view, df, version):
+    """Render a view to its JSON snapshot and static HTML page"""
+    # Only building snapshots needs pandas, the app just reads them
+    from analytics import get_clubs_data, get_summary, create_cumulative_sanctions_chart
+
+    options = VIEWS[view]
+    summary = get_summary(df, options["type"])
+    top_10_df = get_clubs_data(df, limit=10, type=options["type"])
+    fig = create_cumulative_sanctions_chart(df, top_10_df) if not df.empty else None
+
+    snapshot = {
+        "view": view,
+        "version": version,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "summary": summary,
+        "clubs": sorted(df['club_group'].unique().tolist()) if 'club_group' in df else [],
+        "table": top_10_df.to_dict(orient="records"),
+        "figure": json.loads(fig.to_json()) if fig else None,
+    }
+
+    formatted_df = top_10_df.copy()
+    if 'Total Multas' in formatted_df:
+        formatted_df['Total Multas'] = formatted_df['Total Multas'].map('{:,.2f}€'.format)
+    formatted_df = formatted_df.rename(columns={"club_group": "Clube"})
+    metrics = "".join(
+        f'<div class="metric">{METRIC_LABELS[key][0]}<span>{METRIC_LABELS[key][1].format(value)}</span></div>'
+        for key, value in summary.items()
+    )
+    html = HTML_TEMPLATE.format(
+        title=options["title"],
+        metrics=metrics,
+        table=formatted_df.to_html(index=False) if not df.empty else "<p>Sem dados no momento</p>",
+        figure=fig.to_html(full_html=False, include_plotlyjs="cdn") if fig else "",
+        generated_at=snapshot["generated_at"],
+    )
+    return snapshot, html
+
+def build_snapshots(output_dir=SNAPSHOTS_DIR, force=False):
+    """Render every public view whose data version changed since the last build"""
+    import database.datasets
+
+    os.makedirs(output_dir, exist_ok=True)
+    built = []
+    for view, options in VIEWS.items():
+        df, version = database.datasets.load_dataset(options["dataset"])
+        current = read_snapshot(view, output_dir)
+        if not force and current is not None and current["version"] == version:
+            print(view + "...unchanged")
+            continue
+
+        snapshot, html = render_view(view, df, version)
+        write_file(snapshot_path(view, "html", output_dir), html)
+        write_file(snapshot_path(view, "json", output_dir), json.dumps(snapshot, ensure_ascii=False, default=str))
+        print(view + "..." + version)
+        built.append(view)
+    return built
+
+def refresh_snapshots(interval=60, output_dir=SNAPSHOTS_DIR):
+    """Keep the snapshots up to date, rebuilding only when the data changes"""
+    while True:
+        build_snapshots(output_dir)
+        time.sleep(interval)
+
+class SnapshotHandler(SimpleHTTPRequestHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=SNAPSHOTS_DIR, **kwargs)
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "public, max-age=60")
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path in ("", "/"):
+            self.path = "/main.html"
+        super().do_GET()
+
+def serve_snapshots(port=8502):
+    """Serve the rendered snapshots as static files"""
+    server = ThreadingHTTPServer(("", port), SnapshotHandler)
+    print("Serving snapshots on port " + str(port))
+    server.serve_forever()
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        build_snapshots(force="--force" in sys.argv)
+    elif command == "refresh":
+        refresh_snapshots(int(sys.argv[2]) if len(sys.argv) > 2 else 60)
+    elif command == "serve":
+        serve_snapshots(int(sys.argv[2]) if len(sys.argv) > 2 else 8502)
+    else:
+        print("Usage: python snapshot.py [build [--force] | refresh [interval] | serve [port]]")
@@ -0,0 +1,101 @@
+import random
+import pandas as pd
+import pytest
+from analytics import get_clubs_data, get_summary
+from club_aggregates import ClubAggregates
+
+CLUBS = [f"CLUBE {number}" for number in range(12)]
+
+
+def random_row(rng, page_id, minute):
+    return {
+        'page_id': page_id,
+        'club_group': rng.choice(CLUBS),
+        'quantity': 1,
+        'fines': float(rng.choice([0, 25, 50.5, 100])),
+        'suspension_days': rng.randint(0, 30),
+        'date': pd.Timestamp("2024-09-01") + pd.Timedelta(days=rng.randint(0, 400)),
+        'last_edited_time': f"2025-01-01T{minute // 60:02d}:{minute % 60:02d}:00.000Z",
+    }
+
+
+def random_delta(rng, rows, minute, next_id):
+    """Insert, update and delete a few rows, edited at a minute"""
+    for page_id in rng.sample(sorted(rows), min(len(rows), rng.randint(0, 3))):
+        del rows[page_id]
+    for page_id in rng.sample(sorted(rows), min(len(rows), rng.randint(0, 3))):
+        rows[page_id] = random_row(rng, page_id, minute)
+    for _ in range(rng.randint(0, 4)):
+        rows[f"page-{next_id}"] = random_row(rng, f"page-{next_id}", minute)
+        next_id += 1
+    return next_id
+
+
+def expected_series(df, club=None):
+    rows = df if club is None else df[df['club_group'] == club]
+    daily = rows.groupby('date')['quantity'].sum().reset_index()
+    daily['cumulative_quantity'] = daily['quantity'].cumsum()
+    return daily
+
+
+def check(aggregates, df):
+    for type in ("default", "clubs"):
+        expected = get_clubs_data(df, type=type).sort_values(['Total Castigos', 'club_group'], ascending=[False, True]).reset_index(drop=True)
+        pd.testing.assert_frame_equal(aggregates.clubs_data(type=type), expected, check_dtype=False)
+    for type in ("default", "adepts", "clubs"):
+        assert aggregates.summary(type) == get_summary(df, type)
+    for club in [None] + sorted(df['club_group'].unique())[:3]:
+        series = aggregates.cumulative_series(club)
+        pd.testing.assert_frame_equal(series, expected_series(df, club), check_dtype=False)
+        assert aggregates.cumulative_at(club, df['date'].max()) == series['cumulative_quantity'].iloc[-1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sync_matches_full_recomputation(seed):
+    rng = random.Random(seed)
+    rows = {}
+    next_id = 0
+    for _ in range(20):
+        rows[f"page-{next_id}"] = random_row(rng, f"page-{next_id}", 0)
+        next_id += 1
+
+    aggregates = ClubAggregates()
+    for minute in range(60):
+        df = pd.DataFrame(list(rows.values()))
+        aggregates.sync(df)
+        check(aggregates, df)
+        # Notion rounds edit times to the minute: some rows are edited again
+        # in the minute of the sync that already saw them
+        next_id = random_delta(rng, rows, minute if rng.random() < 0.3 else minute + 1, next_id)
+
+
+def test_apply_matches_full_recomputation():
+    rng = random.Random(7)
+    rows = {f"page-{number}": random_row(rng, f"page-{number}", 0) for number in range(30)}
+    aggregates = ClubAggregates()
+    aggregates.apply(inserted=list(rows.values()))
+    for step in range(100):
+        deleted = rng.sample(sorted(rows), 2)
+        for page_id in deleted:
+            del rows[page_id]
+        updated = [random_row(rng, page_id, step) for page_id in rng.sample(sorted(rows), 2)]
+        inserted = [random_row(rng, f"new-{step}-{number}", step) for number in range(3)]
+        rows.update({row['page_id']: row for row in updated + inserted})
+        aggregates.apply(inserted=inserted, updated=updated, deleted=deleted)
+        check(aggregates, pd.DataFrame(list(rows.values())))
+
+
+def test_sync_parses_only_the_delta():
+    rng = random.Random(3)
+    rows = {f"page-{number}": random_row(rng, f"page-{number}", 0) for number in range(200)}
+    aggregates = ClubAggregates()
+    assert aggregates.sync(pd.DataFrame(list(rows.values()))) == 200
+
+    # Nothing changed since a sync in an earlier minute
+    rows = {page_id: {**row, 'last_edited_time': "2024-12-31T23:00:00.000Z"} for page_id, row in rows.items()}
+    aggregates.sync(pd.DataFrame(list(rows.values())))
+    assert aggregates.sync(pd.DataFrame(list(rows.values()))) == 0
+
+    rows["page-5"] = random_row(rng, "page-5", 30)
+    del rows["page-6"]
+    assert aggregates.sync(pd.DataFrame(list(rows.values()))) == 2
@@ -0,0 +1,94 @@
+import io
+import json
+import pytest
+from PIL import Image
+import club_images
+
+
+def png(color):
+    output = io.BytesIO()
+    Image.new("RGB", (400, 400), color).save(output, format="PNG")
+    return output.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeServer:
+    """Image urls served with an ETag, answering 304 to a matching If-None-Match"""
+
+    def __init__(self):
+        self.images = {}
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        headers = headers or {}
+        self.requests.append((url, dict(headers)))
+        etag = str(hash(self.images[url]))
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, self.images[url], {"ETag": etag})
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(club_images, "index", None)
+    monkeypatch.setattr(club_images, "failed", {})
+    monkeypatch.setattr(club_images, "last_saved", 0)
+    server = FakeServer()
+    monkeypatch.setattr(club_images.requests, "get", server.get)
+    return server
+
+
+def test_page_lookup_does_not_download(server):
+    server.images["https://afporto.pt/img/1.png"] = png("red")
+
+    assert club_images.get_thumbnail("https://afporto.pt/img/1.png", download=False) is None
+    assert server.requests == []
+
+    club_images.download_images(["https://afporto.pt/img/1.png"])
+    assert club_images.get_thumbnail("https://afporto.pt/img/1.png", download=False) is not None
+    assert len(server.requests) == 1
+
+
+def test_changed_image_replaces_its_thumbnail(server):
+    url = "https://afporto.pt/img/1.png"
+    server.images[url] = png("red")
+    club_images.download_images([url])
+    first = club_images.get_thumbnail(url, download=False)
+
+    # Unchanged: revalidated with its ETag, not downloaded again
+    club_images.download_images([url])
+    assert "If-None-Match" in server.requests[-1][1]
+    assert club_images.get_thumbnail(url, download=False) == first
+
+    server.images[url] = png("blue")
+    club_images.download_images([url])
+    second = club_images.get_thumbnail(url, download=False)
+    assert second != first
+    assert Image.open(second).getpixel((0, 0))[:3] == (0, 0, 255)
+    # The old thumbnail is no longer used by any url
+    assert not club_images.os.path.exists(first)
+
+
+def test_hit_access_times_are_saved_in_batches(server, monkeypatch):
+    urls = ["https://afporto.pt/img/1.png", "https://afporto.pt/img/2.png"]
+    server.images.update({urls[0]: png("red"), urls[1]: png("green")})
+    club_images.download_images(urls)
+
+    now = [club_images.time.time() + 1000]
+    monkeypatch.setattr(club_images.time, "time", lambda: now[0])
+    club_images.get_thumbnail(urls[0], download=False)
+    now[0] += 1
+    club_images.get_thumbnail(urls[1], download=False)
+
+    with open(club_images.INDEX_FILE, 'r', encoding='utf8') as file:
+        saved = json.load(file)["thumbnails"]
+    # The first hit saved the index, the second waits for the next batch
+    assert saved[club_images.index["urls"][urls[0]]] == now[0] - 1
+    assert saved[club_images.index["urls"][urls[1]]] < now[0] - 1
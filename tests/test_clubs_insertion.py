@@ -0,0 +1,90 @@
+import functools
+import json
+import pytest
+import clubs_insertion
+import jobs
+from config import settings
+
+
+def club(number, name=None):
+    return {"name": name or f"CLUBE {number}", "city": "Porto", "url": f"https://afporto.pt/clube/{number}", "img_url": f"https://afporto.pt/img/{number}.png"}
+
+
+class FakeClubsDatabase:
+    """Club pages of the Notion database, with the calls create_clubs makes"""
+
+    def __init__(self):
+        self.pages = {}
+        self.created = 0
+
+    def create_page(self, data, database_id):
+        self.created += 1
+        page_id = f"page-{self.created}"
+        self.pages[page_id] = {"url": data["Website Url"]["rich_text"][0]["text"]["content"], "archived": False}
+        return {"success": True, "statusCode": 200, "result": {"id": page_id}}
+
+    def update_page(self, data, page_id):
+        return {"success": True, "statusCode": 200, "result": {"id": page_id}}
+
+    def archive_page(self, page_id):
+        self.pages[page_id]["archived"] = True
+        return {"success": True, "statusCode": 200, "result": {"id": page_id}}
+
+    def get_clubs(self):
+        return [{"row_id": page_id, "url": page["url"]} for page_id, page in self.pages.items() if not page["archived"]]
+
+    def live_urls(self):
+        return sorted(club["url"] for club in self.get_clubs())
+
+
+@pytest.fixture
+def notion(tmp_path, monkeypatch):
+    # The journal, clubs_raw.json and the changes file are all in the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CLUBS_DATABASE_ID", "clubs")
+    monkeypatch.setattr(settings, "values", {})
+    database = FakeClubsDatabase()
+    for name in ("create_page", "update_page", "archive_page", "get_clubs"):
+        monkeypatch.setattr(clubs_insertion, name, getattr(database, name))
+    monkeypatch.setattr(clubs_insertion, "notify_changed", lambda dataset: None)
+    monkeypatch.setattr(clubs_insertion, "run_job", functools.partial(jobs.run_job, delay=0))
+    return database
+
+
+def apply_changes(added=(), modified=(), removed=()):
+    with open(clubs_insertion.CHANGES_FILE, 'w') as file:
+        json.dump({"added": list(added), "modified": list(modified), "removed": list(removed)}, file)
+    clubs_insertion.create_clubs()
+
+
+def test_first_run_inserts_each_club_once(notion):
+    with open('clubs_raw.json', 'w') as file:
+        json.dump([club(1), club(2)], file)
+    clubs_insertion.create_clubs()
+    clubs_insertion.create_clubs()
+
+    assert notion.created == 2
+    assert notion.live_urls() == [club(1)["url"], club(2)["url"]]
+
+
+def test_removed_club_added_again_is_recreated(notion):
+    apply_changes(added=[club(1), club(2)])
+    apply_changes(removed=[club(1)])
+    assert notion.live_urls() == [club(2)["url"]]
+
+    apply_changes(added=[club(1)])
+    assert notion.created == 3
+    assert notion.live_urls() == [club(1)["url"], club(2)["url"]]
+
+    # And can be removed again, with the same fingerprint as the first time
+    apply_changes(removed=[club(1)])
+    assert notion.live_urls() == [club(2)["url"]]
+
+
+def test_forget_does_not_touch_other_urls(notion):
+    apply_changes(added=[club(1), club(10)])
+    apply_changes(removed=[club(1)])
+    apply_changes(added=[club(1), club(10)])
+
+    # Club 10 shares the prefix of club 1's url and was never removed
+    assert notion.created == 3
@@ -0,0 +1,43 @@
+import communiques_ingestion
+
+COMMUNIQUE = """<html><body>
+<p>COMUNICADO OFICIAL 12 - PORTO, 14 DE OUTUBRO DE 2024</p>
+<p>DIRIGENTES</p>
+<table>
+<tr><td>JOAO SILVA</td><td>FC PORTO B</td><td>S15</td><td>15 DIAS</td><td>MULTA DE 50,00 €</td></tr>
+{extra}
+<tr><td>RUI COSTA</td><td>LEIXOES SC</td><td>S17</td><td>30 DIAS</td></tr>
+<tr><td>RUI COSTA</td><td>LEIXOES SC</td><td>S17</td><td>30 DIAS</td></tr>
+</table>
+<p>PUBLICO</p>
+<p>LEIXOES SC - MULTA DE 100,00 €</p>
+</body></html>
+"""
+
+
+def parse(tmp_path, extra=""):
+    path = tmp_path / "comunicado_12.html"
+    path.write_text(COMMUNIQUE.format(extra=extra), encoding="utf8")
+    communiques_ingestion.init_worker([(communiques_ingestion.normalize(name), name) for name in ("LEIXOES SC", "FC PORTO B", "BOAVISTA FC")])
+    return communiques_ingestion.parse_communique(str(path))[1]
+
+
+def test_rows_of_each_section(tmp_path):
+    rows = parse(tmp_path)
+
+    assert [(row["dataset"], row["club_group"]) for row in rows] == [
+        ("managers", "FC PORTO B"), ("managers", "LEIXOES SC"), ("managers", "LEIXOES SC"), ("adepts", "LEIXOES SC"),
+    ]
+    assert rows[0]["suspension_days"] == 15 and rows[0]["fines"] == 50.0 and rows[0]["formation"] == "S15"
+    assert rows[0]["date"] == "2024-10-14"
+
+
+def test_ids_follow_the_content_not_the_line(tmp_path):
+    before = parse(tmp_path)
+    # A corrected communiqué with one more sanction moves the lines below it
+    after = parse(tmp_path, extra="<tr><td>ANA REIS</td><td>BOAVISTA FC</td><td>S13</td><td>8 DIAS</td></tr>")
+
+    assert len(after) == len(before) + 1
+    assert {row["sanction_id"] for row in before} < {row["sanction_id"] for row in after}
+    # Identical lines of a document are still different sanctions
+    assert len({row["sanction_id"] for row in before}) == len(before)
@@ -0,0 +1,102 @@
+import json
+import threading
+import time
+import pytest
+import database.notion
+import database.notion_async
+from config import settings
+from load_test import FakeNotionHandler, start_fake_notion
+
+
+class RecordingHandler(FakeNotionHandler):
+    """Fake Notion API that logs every query and fails the second page of the "broken" database"""
+
+    requests = []
+    lock = threading.Lock()
+
+    def respond(self, parts, body):
+        with self.lock:
+            self.requests.append((time.monotonic(), parts[-2], body.get("start_cursor")))
+
+        if parts[-2] == "broken" and body.get("start_cursor"):
+            content = json.dumps({"object": "error", "status": 400, "code": "validation_error", "message": "bad cursor"}).encode("utf8")
+            self.send_response(400)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+        super().respond(parts, body)
+
+
+@pytest.fixture
+def fake_notion(monkeypatch):
+    server, clubs, environment = start_fake_notion(scale=3, handler=RecordingHandler)
+    RecordingHandler.databases["broken"] = RecordingHandler.databases["managers"]
+    RecordingHandler.requests = []
+    for name, value in environment.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("NOTION_CASSETTE_MODE", raising=False)
+    # Settings are resolved once per process, start from the fake environment
+    monkeypatch.setattr(settings, "values", {})
+    yield RecordingHandler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("schema", [None, "managers_sanctions"])
+def test_pagination_matches_blocking_client(fake_notion, schema):
+    expected = database.notion.get_results("managers", schema)
+    result = database.notion_async.get_results_many(["managers"], {"managers": schema}, rate=100)["managers"]
+
+    assert result == expected
+    assert result["success"] and len(result["result"]) == len(fake_notion.databases["managers"])
+    cursors = [cursor for _, database_id, cursor in fake_notion.requests if database_id == "managers"]
+    # 354 rows in pages of 100, fetched once by each client
+    assert cursors == [None, "100", "200", "300"] * 2
+
+
+def test_error_page_returns_error_contract(fake_notion):
+    result = database.notion_async.get_results_many(["broken"], rate=100)["broken"]
+
+    assert result == database.notion.get_results("broken")
+    assert result["success"] is False
+    assert result["statusCode"] == 400
+    assert result["result"] is None
+    assert result["error"]["code"] == "validation_error"
+
+
+def test_databases_share_one_rate_limit(fake_notion):
+    rate = 20
+    results = database.notion_async.get_results_many(["managers", "adepts"], rate=rate)
+
+    assert all(result["success"] for result in results.values())
+    times = sorted(request[0] for request in fake_notion.requests)
+    # Both databases start at once, then every request waits for its slot
+    assert {request[1] for request in fake_notion.requests[:2]} == {"managers", "adepts"}
+    assert all(later - earlier >= 0.9 / rate for earlier, later in zip(times, times[1:]))
+
+
+def test_next_page_requested_before_page_is_parsed(fake_notion, monkeypatch):
+    parsed = []
+    split_query = database.notion_async.split_query
+
+    def slow_split_query(content, schema=None):
+        next_cursor, build_records = split_query(content, schema)
+
+        def build():
+            time.sleep(0.2)
+            parsed.append((time.monotonic(), next_cursor))
+            return build_records()
+        return next_cursor, build
+
+    monkeypatch.setattr(database.notion_async, "split_query", slow_split_query)
+    result = database.notion_async.get_results_many(["managers"], {"managers": "managers_sanctions"}, rate=100)["managers"]
+
+    assert result["success"]
+    requested = {cursor: at for at, _, cursor in fake_notion.requests}
+    # The page whose next cursor is "100" is the first one: its records are
+    # still being built when the request for page "100" reaches the server
+    parse_ends = dict((cursor, at) for at, cursor in parsed)
+    assert requested["100"] < parse_ends["100"]
+    assert requested["200"] < parse_ends["200"]